@@ -0,0 +1,270 @@
+import argparse
+import csv
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from utils import parse_fit_file
+
+# pyarrow is optional - Parquet export is only offered when it is installed
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet'
+}
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def available_export_formats():
+    """
+    Return the export formats that can be written in this environment
+    """
+    return [fmt for fmt in EXPORT_FORMATS if fmt != 'parquet' or pq is not None]
+
+
+def _span_chunks(df, columns, x_column, x_min, x_max, chunk_size):
+    """
+    Yield the rows of the span x_min..x_max in chunks of at most chunk_size rows
+    Only the requested columns of one chunk are copied at a time.
+    """
+    x = df[x_column].to_numpy() if x_column in df.columns else None
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size][columns]
+        if x is not None and (x_min is not None or x_max is not None):
+            x_chunk = x[start:start + chunk_size]
+            mask = np.ones(len(x_chunk), dtype=bool)
+            if x_min is not None:
+                mask &= x_chunk >= x_min
+            if x_max is not None:
+                mask &= x_chunk <= x_max
+            if not mask.any():
+                continue
+            chunk = chunk[mask]
+        yield chunk
+
+
+def span_frame(df, columns, x_column, x_min=None, x_max=None, resample=False):
+    """
+    Return a copy of only the columns and rows of df needed to export a span
+
+    Used before handing a dataset to a worker process, so only this slice is
+    pickled instead of the whole DataFrame. Resampling keeps one row on each
+    side of the span for the interpolation at its edges.
+    """
+    columns = [x_column] + [col for col in columns if col != x_column and col in df.columns]
+    if x_column not in df.columns:
+        return df.iloc[0:0][[col for col in columns if col in df.columns]].copy()
+
+    x = df[x_column].to_numpy()
+    mask = np.ones(len(x), dtype=bool)
+    if x_min is not None:
+        mask &= x >= x_min
+    if x_max is not None:
+        mask &= x <= x_max
+
+    if resample:
+        inside = np.flatnonzero(mask)
+        if not len(inside):
+            # The interpolation may still need the rows around an empty span
+            inside = np.array([max(int(np.searchsorted(x, x_min)) - 1, 0)]) if len(x) else inside
+        if len(inside):
+            first = max(inside[0] - 1, 0)
+            last = min(inside[-1] + 2, len(x))
+            return df.iloc[first:last][columns].copy()
+    return df.loc[mask, columns].copy()
+
+
+def _resampled_chunks(df, columns, x_column, x_min, x_max, step, chunk_size):
+    """
+    Yield the span linearly interpolated onto a grid of multiples of step
+
+    The grid is anchored at multiples of step, so exports of different files
+    share the same x values and can be compared row by row.
+    """
+    x = df[x_column].to_numpy(dtype=np.float64)
+    if len(x) > 1 and np.any(np.diff(x) < 0):
+        raise ValueError(f"X-Spalte '{x_column}' ist nicht monoton und kann nicht neu abgetastet werden")
+
+    start = x[0] if x_min is None else max(x_min, x[0])
+    end = x[-1] if x_max is None else min(x_max, x[-1])
+    first = int(np.ceil(start / step))
+    last = int(np.floor(end / step))
+
+    numeric_columns = [col for col in columns
+                       if col != x_column and pd.api.types.is_numeric_dtype(df[col])]
+    values = {col: df[col].to_numpy(dtype=np.float64) for col in numeric_columns}
+
+    for chunk_first in range(first, last + 1, chunk_size):
+        grid = np.arange(chunk_first, min(chunk_first + chunk_size, last + 1)) * step
+        chunk = {x_column: grid}
+        for col in numeric_columns:
+            chunk[col] = np.interp(grid, x, values[col])
+        yield pd.DataFrame(chunk)
+
+
+def export_span(df, columns, x_column, path, fmt='csv', x_min=None, x_max=None,
+                resample_step=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream the span x_min..x_max of the given columns to a file
+
+    Args:
+        df: DataFrame to export
+        columns: Columns to write, the x column is always written first
+        x_column: Column the span refers to
+        path: Target file path
+        fmt: 'csv' or 'parquet'
+        x_min: Start of the span or None
+        x_max: End of the span or None
+        resample_step: Interpolate onto a grid with this step in x units, None keeps the raw rows
+        chunk_size: Number of rows held in memory at a time
+
+    Returns:
+        Number of rows written
+    """
+    columns = [x_column] + [col for col in columns if col != x_column and col in df.columns]
+    if x_column not in df.columns:
+        raise ValueError(f"X-Spalte '{x_column}' fehlt")
+
+    if resample_step:
+        chunks = _resampled_chunks(df, columns, x_column, x_min, x_max, resample_step, chunk_size)
+    else:
+        chunks = _span_chunks(df, columns, x_column, x_min, x_max, chunk_size)
+
+    rows = 0
+    if fmt == 'csv':
+        with open(path, 'w', newline='') as f:
+            header_written = False
+            for chunk in chunks:
+                chunk.to_csv(f, index=False, header=not header_written)
+                header_written = True
+                rows += len(chunk)
+            if not header_written:
+                csv.writer(f).writerow(columns)
+    elif fmt == 'parquet':
+        if pq is None:
+            raise ValueError("Parquet-Export benötigt pyarrow")
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                # One row group per chunk keeps memory bounded
+                writer.write_table(table.cast(writer.schema))
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            # Empty span, write an empty file with the columns of the DataFrame
+            empty = df.iloc[0:0][columns]
+            pq.write_table(pa.Table.from_pandas(empty, preserve_index=False), path)
+    else:
+        raise ValueError(f"Unbekanntes Exportformat: {fmt}")
+    return rows
+
+
+def _export_job(source, columns, x_column, out_dir, fmt, x_min, x_max, resample_step, chunk_size):
+    """
+    Export one dataset, source is a DataFrame or the path of a FIT file
+    Runs in a worker process.
+    """
+    df = parse_fit_file(source) if isinstance(source, (str, Path)) else source
+    if df is None:
+        raise ValueError(f"Keine Daten in {source}")
+
+    # span_frame() slices drop file_source, the GUI passes the name in attrs
+    if 'file_name' in df.attrs:
+        file_name = df.attrs['file_name']
+    elif 'file_source' in df.columns and not df.empty:
+        file_name = df['file_source'].iloc[0]
+    else:
+        file_name = Path(str(source)).stem
+    path = Path(out_dir) / f"{file_name}{EXPORT_FORMATS[fmt]}"
+    rows = export_span(df, columns, x_column, path, fmt, x_min, x_max, resample_step, chunk_size)
+    return str(path), rows
+
+
+def export_datasets(jobs, out_dir, x_column, fmt='csv', x_min=None, x_max=None, resample_step=None,
+                    chunk_size=DEFAULT_CHUNK_SIZE, max_workers=None, progress=None, is_cancelled=None):
+    """
+    Export several datasets in parallel worker processes
+
+    Args:
+        jobs: List of (source, columns) tuples, source is a FIT file path or a DataFrame,
+              ideally cut down with span_frame() since it is pickled to a worker
+        out_dir: Directory for the exported files
+        progress: Optional callback progress(done, total, message)
+        is_cancelled: Optional callback returning True to stop before the remaining jobs
+
+    Returns:
+        List of (path, rows) of the written files and list of error messages
+    """
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    max_workers = max_workers or min(len(jobs), os.cpu_count() or 1) or 1
+
+    results = []
+    errors = []
+    # Spawn keeps the workers independent of the (threaded) GUI process
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        futures = {executor.submit(_export_job, source, columns, x_column, out_dir, fmt,
+                                   x_min, x_max, resample_step, chunk_size): source
+                   for source, columns in jobs}
+        for done, future in enumerate(as_completed(futures), start=1):
+            if is_cancelled is not None and is_cancelled():
+                for pending in futures:
+                    pending.cancel()
+                break
+            try:
+                path, rows = future.result()
+                results.append((path, rows))
+                message = f"{Path(path).name}: {rows} Zeilen"
+            except Exception as e:
+                source = futures[future]
+                message = f"Fehler beim Exportieren von {source if isinstance(source, (str, Path)) else 'Datensatz'}: {e}"
+                errors.append(message)
+            if progress is not None:
+                progress(done, len(futures), message)
+    return results, errors
+
+
+def run_export_cli(argv):
+    """
+    Headless export of FIT files, e.g.
+    python main.py --export out --columns power,heart_rate --format csv ride1.fit ride2.fit
+    """
+    parser = argparse.ArgumentParser(prog='main.py --export', description="FIT-Dateien exportieren")
+    parser.add_argument('--export', dest='out_dir', required=True, help="Zielverzeichnis")
+    parser.add_argument('--columns', required=True, help="Kommagetrennte Liste der Spalten")
+    parser.add_argument('--x-column', default='elapsed_time')
+    parser.add_argument('--start', type=float, default=None, help="Beginn der Auswahl (X-Einheiten)")
+    parser.add_argument('--end', type=float, default=None, help="Ende der Auswahl (X-Einheiten)")
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+    parser.add_argument('--resample', type=float, default=None, help="Schrittweite für Neuabtastung")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('files', nargs='+')
+    args = parser.parse_args(argv)
+
+    if args.format not in available_export_formats():
+        print("Parquet-Export benötigt pyarrow")
+        return 1
+
+    columns = [col.strip() for col in args.columns.split(',') if col.strip()]
+    jobs = [(file_path, columns) for file_path in args.files]
+
+    def progress(done, total, message):
+        print(f"[{done}/{total}] {message}")
+
+    _, errors = export_datasets(jobs, args.out_dir, args.x_column, args.format, args.start, args.end,
+                                args.resample, max_workers=args.workers, progress=progress)
+    return 1 if errors else 0
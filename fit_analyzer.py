@@ -4,6 +4,7 @@ from PyQt5.QtWidgets import QApplication, QFileDialog
 
 # Import the centralized parsing function
 from utils import parse_fit_file
+from workspace import WORKSPACE_SUFFIX
 
 class FitAnalyzer:
     def __init__(self):
@@ -49,4 +50,9 @@ class FitAnalyzer:
         # Start with an empty window instead of immediately loading a file
         window = TrainingPlotWindow([])
         window.show()
+        
+        # Reopen a workspace passed on the command line
+        workspace_paths = [arg for arg in sys.argv[1:] if arg.endswith(WORKSPACE_SUFFIX)]
+        if workspace_paths:
+            window.load_workspace(workspace_paths[0])
         return self.app.exec_()
\ No newline at end of file
@@ -2,6 +2,11 @@ import sys
 from fit_analyzer import FitAnalyzer
 
 def main():
+    # Headless export without starting the GUI
+    if any(arg == '--export' or arg.startswith('--export=') for arg in sys.argv[1:]):
+        from export import run_export_cli
+        return run_export_cli(sys.argv[1:])
+    
     analyzer = FitAnalyzer()
     return analyzer.run()
 
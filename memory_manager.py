@@ -0,0 +1,179 @@
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+from span_stats import ChannelHistogram
+from workspace import WORKSPACE_SUFFIX, load_workspace, save_workspace
+
+DEFAULT_BUDGET_MB = 2048
+
+
+def _is_mapped(array):
+    """
+    Check if an array lives in a memory-mapped file instead of the heap
+    """
+    base = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return True
+        base = getattr(base, 'base', None)
+    return False
+
+
+def _array_size(array):
+    if not isinstance(array, np.ndarray) or _is_mapped(array):
+        return 0
+    return array.nbytes
+
+
+def dataset_size(df, histograms=()):
+    """
+    Return the resident size in bytes of a DataFrame and its histograms
+    Memory-mapped columns are not counted, the OS can drop their pages at any time.
+    """
+    size = 0
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biufcmM':
+            size += _array_size(series.to_numpy())
+        elif series.dtype == object:
+            # Rows often share their objects (constant columns restored from a
+            # workspace), so count the pointers plus every distinct value once
+            unique = pd.unique(series.to_numpy())
+            size += (int(series.memory_usage(index=False, deep=False)) +
+                     int(pd.Series(unique).memory_usage(index=False, deep=True)) - 8 * len(unique))
+        else:
+            # Categorical and extension columns
+            size += int(series.memory_usage(index=False, deep=True))
+    for histogram in histograms:
+        if histogram is not None:
+            fields, _ = histogram.to_arrays()
+            size += sum(_array_size(array) for array in fields.values())
+    return size
+
+
+def spill_dataset(path, df, histograms):
+    """
+    Write a dataset and its histograms to a cache file
+    Does not touch the budget, so it can run on a worker thread.
+
+    Args:
+        path: Cache file path from MemoryBudget.cache_path()
+        histograms: Dictionary (file name, x column, column) -> ChannelHistogram of this file
+
+    Returns:
+        Tuple (memory-mapped DataFrame, dictionary of memory-mapped histograms)
+    """
+    save_workspace(path, [df], {}, histograms)
+    dataframes, _, mapped_histograms = load_workspace(path)
+    return dataframes[0], mapped_histograms
+
+
+def remove_cache_file(path):
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class MemoryBudget:
+    """
+    Keeps the resident size of the loaded datasets below a budget
+
+    The least recently used datasets that are not visible are spilled to a
+    cache file and replaced by memory-mapped views of it; reload() brings
+    them back into RAM when they are used again.
+    """
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.usage = OrderedDict()  # file name -> None, least recently used first
+        self.spilled = {}  # file name -> cache file path
+        self.cache_dir = None
+
+    def touch(self, file_name):
+        """
+        Mark a dataset as recently used
+        """
+        self.usage.pop(file_name, None)
+        self.usage[file_name] = None
+
+    def forget(self, file_name):
+        """
+        Drop a removed dataset and its cache file
+        """
+        self.usage.pop(file_name, None)
+        remove_cache_file(self.spilled.pop(file_name, None))
+
+    def is_spilled(self, file_name):
+        return file_name in self.spilled
+
+    def cache_path(self, file_name):
+        if self.cache_dir is None:
+            self.cache_dir = tempfile.mkdtemp(prefix='fit_analyse_')
+        safe_name = re.sub(r'[^\w.-]', '_', str(file_name))
+        return os.path.join(self.cache_dir, f"{safe_name}{WORKSPACE_SUFFIX}")
+
+    def mark_spilled(self, file_name, path):
+        """
+        Record that a dataset was replaced by the memory-mapped views of its cache file
+        """
+        self.spilled[file_name] = path
+
+    def reload(self, file_name, df, histograms):
+        """
+        Copy a spilled dataset and its histograms back into RAM
+
+        Returns:
+            Tuple (DataFrame, dictionary of histograms)
+        """
+        path = self.spilled.pop(file_name, None)
+        loaded = df.copy(deep=True)
+        loaded_histograms = {}
+        for key, histogram in histograms.items():
+            if histogram is None:
+                loaded_histograms[key] = None
+                continue
+            fields, meta = histogram.to_arrays()
+            loaded_histograms[key] = ChannelHistogram.from_arrays(
+                {field: np.array(array) for field, array in fields.items()}, meta)
+        # The mapped views above were copied, the file is not needed anymore
+        remove_cache_file(path)
+        self.touch(file_name)
+        return loaded, loaded_histograms
+
+    def eviction_candidates(self, sizes, visible):
+        """
+        Return the file names to spill so the total size fits the budget
+
+        Args:
+            sizes: Dictionary file name -> resident size in bytes
+            visible: Set of file names that are currently shown
+        """
+        total = sum(sizes.values())
+        candidates = []
+        # Datasets that were never touched count as least recently used
+        order = [file_name for file_name in sizes if file_name not in self.usage] + list(self.usage)
+        for file_name in order:
+            if total <= self.budget_bytes:
+                break
+            if file_name in visible or file_name in self.spilled or file_name not in sizes:
+                continue
+            candidates.append(file_name)
+            total -= sizes[file_name]
+        return candidates
+
+    def cleanup(self):
+        """
+        Remove all cache files and forget the usage history
+        """
+        if self.cache_dir is not None:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self.cache_dir = None
+        self.spilled = {}
+        self.usage.clear()
@@ -0,0 +1,599 @@
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import Qt, QTimer
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+from matplotlib.widgets import SpanSelector
+
+from utils import get_axis_color, get_line_style
+
+# pyqtgraph is optional - the fast backend is only offered when it is installed
+try:
+    import pyqtgraph as pg
+except ImportError:
+    pg = None
+
+
+def get_display_column(df, column):
+    """
+    Returns the correct display column based on the selected column
+    """
+    # For timestamp_numeric return original timestamp
+    if column == 'timestamp_numeric' and 'timestamp' in df.columns:
+        return 'timestamp'
+    # For time_of_day_numeric return original time_of_day
+    elif column == 'time_of_day_numeric' and 'time_of_day' in df.columns:
+        return 'time_of_day'
+    return column
+
+
+def get_x_label(x_column):
+    """
+    Return the axis label for the given x column
+    """
+    if x_column == 'elapsed_time':
+        return "Zeit (Minuten)"
+    elif x_column == 'timestamp_numeric':
+        return "Uhrzeit"
+    elif x_column == 'time_of_day_numeric':
+        return "Tageszeit"
+    return x_column
+
+
+def format_time_of_day(seconds):
+    """
+    Format seconds since midnight as HH:MM:SS
+    """
+    seconds = int(round(seconds)) % 86400
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def decimate_indices(values, max_points):
+    """
+    Return the row indices of a min/max decimation of values to about max_points
+
+    The rows are split into max_points // 2 buckets and the minimum and maximum
+    of every bucket are kept, so peaks stay visible.
+
+    Returns:
+        Sorted index array or None if no decimation is needed
+    """
+    n = len(values)
+    if max_points is None or n <= max_points:
+        return None
+
+    buckets = max_points // 2
+    bucket_size = -(-n // buckets)
+    padded = np.full(buckets * bucket_size, np.nan)
+    padded[:n] = values
+    padded = padded.reshape(buckets, bucket_size)
+
+    # All-NaN buckets fall back to their first row
+    valid = ~np.all(np.isnan(padded), axis=1)
+    filled = np.where(np.isnan(padded), 0.0, padded)
+    low = np.where(valid, np.argmin(np.where(np.isnan(padded), np.inf, filled), axis=1), 0)
+    high = np.where(valid, np.argmax(np.where(np.isnan(padded), -np.inf, filled), axis=1), 0)
+
+    offsets = np.arange(buckets) * bucket_size
+    indices = np.unique(np.concatenate((offsets + low, offsets + high)))
+    return indices[indices < n]
+
+
+def build_plot_model(dataframes, selected_y_columns, x_column, max_points=None):
+    """
+    Build the backend independent series/axis model for the current selection
+
+    Every unique selected Y column gets one axis (colored by its index), every
+    file that has this column selected contributes one series (styled by the
+    index of the file).
+
+    Args:
+        dataframes: List of loaded DataFrames
+        selected_y_columns: Dictionary of selected y columns per file
+        x_column: Selected (numeric) x column
+        max_points: Decimate series longer than this, None plots every row
+
+    Returns:
+        List of axis dictionaries with the keys 'column', 'color' and 'series'
+    """
+    # Track all columns across all files
+    all_columns = []
+    for file_name, columns in selected_y_columns.items():
+        for column in columns:
+            if column not in all_columns:
+                all_columns.append(column)
+
+    model = []
+    for i, y_column in enumerate(all_columns):
+        series = []
+        for file_idx, df in enumerate(dataframes):
+            if df.empty or 'file_source' not in df.columns:
+                continue
+
+            file_name = df['file_source'].iloc[0]
+
+            # Skip if column not selected for this file
+            if (file_name not in selected_y_columns or
+                y_column not in selected_y_columns[file_name]):
+                continue
+
+            # Skip if column not in this dataframe
+            if y_column not in df.columns:
+                continue
+
+            # Check if X column exists
+            display_x_column = get_display_column(df, x_column)
+            if display_x_column not in df.columns and x_column not in df.columns:
+                continue
+
+            index = None
+            if max_points is not None and pd.api.types.is_numeric_dtype(df[y_column]):
+                index = decimate_indices(df[y_column].to_numpy(dtype=np.float64), max_points)
+
+            series.append({
+                'df': df,
+                'index': index,
+                'file_name': file_name,
+                'y_column': y_column,
+                'x_column': x_column if x_column in df.columns else display_x_column,
+                'display_x_column': display_x_column,
+                'label': f"{y_column} - {file_name}",
+                'line_style': get_line_style(file_idx)
+            })
+
+        model.append({
+            'column': y_column,
+            'color': get_axis_color(i),
+            'series': series
+        })
+    return model
+
+
+class PlotBackend:
+    """
+    Base class for the plot renderers used by TrainingPlotWindow
+
+    A backend owns its Qt widgets, renders a model built by build_plot_model
+    and reports span selections (in x column units) through on_select.
+    """
+    name = None
+    label = None
+    # Series are decimated to this many points before rendering, None keeps all
+    max_points = None
+
+    def __init__(self, parent, on_select):
+        self.parent = parent
+        self.on_select = on_select
+
+    @classmethod
+    def is_available(cls):
+        return True
+
+    def widgets(self):
+        """
+        Returns the widgets to add to the plot layout
+        """
+        raise NotImplementedError
+
+    def show_empty(self, title):
+        raise NotImplementedError
+
+    def render(self, model, x_column, span_start=None, span_end=None):
+        raise NotImplementedError
+
+    def setup_span_selector(self):
+        pass
+
+    def close(self):
+        for widget in self.widgets():
+            widget.setParent(None)
+            widget.deleteLater()
+
+
+class MatplotlibBackend(PlotBackend):
+    """
+    Default backend rendering through matplotlib's FigureCanvasQTAgg
+
+    Long series are drawn decimated. After zooming or panning, the lines are
+    decimated again for the visible range only, so zooming in reveals the raw
+    samples.
+    """
+    name = 'matplotlib'
+    label = "Matplotlib (Standard)"
+    max_points = 20000
+    # Wait for the view to settle before decimating again, panning changes it continuously
+    REFINE_DELAY_MS = 150
+
+    def __init__(self, parent, on_select):
+        super().__init__(parent, on_select)
+        self.figure, self.ax1 = plt.subplots(figsize=(10, 6))
+        self.canvas = FigureCanvas(self.figure)
+        self.toolbar = NavigationToolbar(self.canvas, parent)
+        self.axes = {}  # Store axes for each data series
+        self.span = None
+        self.decimated_lines = []  # Lines drawn from a decimated series
+        self.date_axis = False  # True while the x axis shows timestamp datetimes
+
+        self.refine_timer = QTimer(self.canvas)
+        self.refine_timer.setSingleShot(True)
+        self.refine_timer.setInterval(self.REFINE_DELAY_MS)
+        self.refine_timer.timeout.connect(self.refine_lines)
+
+    def widgets(self):
+        return [self.canvas, self.toolbar]
+
+    def close(self):
+        super().close()
+        plt.close(self.figure)
+
+    def setup_span_selector(self):
+        self.span = SpanSelector(
+            self.ax1,
+            self._on_span,
+            'horizontal',
+            useblit=True,
+            props=dict(alpha=0.2, facecolor='blue'),
+            interactive=True
+        )
+
+    def _on_span(self, xmin, xmax):
+        # The Uhrzeit axis plots datetimes, report the span in timestamp_numeric seconds
+        if self.date_axis:
+            xmin = mdates.num2date(xmin).timestamp()
+            xmax = mdates.num2date(xmax).timestamp()
+        self.on_select(xmin, xmax)
+
+    def _to_axis_units(self, x):
+        if self.date_axis:
+            return mdates.date2num(np.datetime64(int(round(x * 1e6)), 'us'))
+        return x
+
+    def show_empty(self, title):
+        self.figure.clear()
+        self.date_axis = False
+        self.decimated_lines = []
+        self.ax1 = self.figure.add_subplot(111)
+        self.ax1.set_title(title)
+        self.canvas.draw()
+
+    def render(self, model, x_column, span_start=None, span_end=None):
+        self.figure.clear()
+        self.axes = {}
+        self.decimated_lines = []
+        self.date_axis = False
+
+        # Create the main axis
+        self.ax1 = self.figure.add_subplot(111)
+
+        # Store the right-side y-axes we create
+        right_axes = []
+
+        # Create a y-axis for each unique column
+        for i, axis in enumerate(model):
+            y_column = axis['column']
+            color = axis['color']
+
+            if i == 0:
+                # First dataset uses the main left y-axis
+                ax = self.ax1
+            else:
+                # Create a new y-axis on the right for each additional dataset
+                ax = self.ax1.twinx()
+
+                # Offset each additional axis to prevent overlap
+                if right_axes:
+                    offset = 60 * (len(right_axes))
+                    ax.spines['right'].set_position(('outward', offset))
+
+                right_axes.append(ax)
+
+            ax.set_ylabel(y_column, color=color)
+            ax.tick_params(axis='y', labelcolor=color)
+
+            # Store the axis for this column
+            self.axes[y_column] = ax
+
+            for series in axis['series']:
+                self._plot_series(ax, series, color)
+
+        self.ax1.set_xlabel(get_x_label(x_column))
+        self.ax1.set_title('Trainingsdaten')
+        self.ax1.grid(True)
+
+        # Add legend
+        handles, labels = [], []
+        for ax in [self.ax1] + right_axes:
+            h, l = ax.get_legend_handles_labels()
+            handles.extend(h)
+            labels.extend(l)
+
+        if handles:
+            self.ax1.legend(handles, labels, loc='upper left', bbox_to_anchor=(0, -0.15), ncol=3)
+
+        # Highlight selected region if any
+        if span_start is not None and span_end is not None:
+            self.ax1.axvspan(self._to_axis_units(span_start), self._to_axis_units(span_end),
+                             alpha=0.2, color='blue')
+
+        self.figure.tight_layout()
+        self.canvas.draw()
+
+        # Connected after drawing, so the initial autoscaling does not trigger it
+        if self.decimated_lines:
+            self.ax1.callbacks.connect('xlim_changed', lambda ax: self.refine_timer.start())
+
+    def refine_lines(self):
+        """
+        Decimate the decimated lines again for the visible x range
+        """
+        if not self.decimated_lines:
+            return
+        x_min, x_max = self.ax1.get_xlim()
+        for entry in self.decimated_lines:
+            line = entry['line']
+            if entry['x'] is None:
+                # Line data converted to axis units, e.g. dates to floats
+                entry['x'] = np.asarray(line.axes.convert_xunits(entry['x_values']), dtype=np.float64)
+            x = entry['x']
+            y = entry['y']
+
+            visible = np.flatnonzero((x >= x_min) & (x <= x_max))
+            index = entry['index']
+            if len(visible):
+                refined = decimate_indices(y[visible], self.max_points)
+                visible = visible if refined is None else visible[refined]
+                # Keep the rows next to the view, so the line runs to the border
+                neighbours = np.array([visible[0] - 1, visible[-1] + 1])
+                neighbours = neighbours[(neighbours >= 0) & (neighbours < len(x))]
+                index = np.union1d(index, np.concatenate((visible, neighbours)))
+            line.set_data(x[index], y[index])
+        self.canvas.draw_idle()
+
+    def _plot_series(self, ax, series, color):
+        full_df = series['df']
+        df = full_df
+        if series.get('index') is not None:
+            df = df.iloc[series['index']]
+        y_column = series['y_column']
+        display_x_column = series['display_x_column']
+        label = series['label']
+        line_style = series['line_style']
+
+        # Plot the data using the appropriate axis and formatting
+        try:
+            if display_x_column == 'timestamp' and 'timestamp_numeric' in df.columns:
+                # Plot with timestamp as X-axis
+                plot_x_column = display_x_column
+                self.date_axis = True
+                ax.plot(df[display_x_column], df[y_column], label=label, color=color, linestyle=line_style)
+                self.ax1.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
+                self.ax1.xaxis.set_major_locator(mdates.AutoDateLocator())
+                self.figure.autofmt_xdate()  # Auto-rotate date labels
+
+            elif display_x_column == 'time_of_day' and 'time_of_day_numeric' in df.columns:
+                # Plot with time_of_day as X-axis using the numeric values for positioning
+                plot_x_column = 'time_of_day_numeric'
+                ax.plot(df['time_of_day_numeric'], df[y_column], label=label, color=color, linestyle=line_style)
+
+                # Show the tick positions (seconds since midnight) as time_of_day strings
+                self.ax1.xaxis.set_major_formatter(plt.FuncFormatter(lambda x, pos: format_time_of_day(x)))
+                # Use about 5-10 ticks depending on data size
+                num_ticks = min(10, max(5, len(full_df) // 100))
+                self.ax1.xaxis.set_major_locator(plt.MaxNLocator(num_ticks))
+                self.figure.autofmt_xdate()  # Auto-rotate time labels
+            else:
+                # Regular numeric x-axis
+                plot_x_column = series['x_column']
+                ax.plot(df[series['x_column']], df[y_column], label=label, color=color, linestyle=line_style)
+        except Exception as e:
+            print(f"Fehler beim Plotten von {y_column} für {series['file_name']}: {e}")
+            return
+
+        if series.get('index') is not None:
+            self.decimated_lines.append({
+                'line': ax.get_lines()[-1],
+                'index': series['index'],
+                'x_values': full_df[plot_x_column].to_numpy(),
+                'x': None,  # Converted on the first refinement
+                'y': full_df[y_column].to_numpy(dtype=np.float64)
+            })
+
+
+if pg is not None:
+    class _SpanViewBox(pg.ViewBox):
+        """
+        ViewBox that turns Shift + left drag into a span selection
+        Plain drags keep pyqtgraph's pan/zoom behavior.
+        """
+        def __init__(self, on_span, **kwargs):
+            super().__init__(**kwargs)
+            self.on_span = on_span
+
+        def mouseDragEvent(self, ev, axis=None):
+            if ev.button() == Qt.LeftButton and ev.modifiers() & Qt.ShiftModifier:
+                ev.accept()
+                start = self.mapSceneToView(ev.buttonDownScenePos()).x()
+                end = self.mapSceneToView(ev.scenePos()).x()
+                self.on_span(min(start, end), max(start, end), ev.isFinish())
+                return
+            super().mouseDragEvent(ev, axis)
+
+    class _TimeOfDayAxisItem(pg.AxisItem):
+        """
+        Axis showing seconds since midnight as HH:MM:SS
+        """
+        def tickStrings(self, values, scale, spacing):
+            return [format_time_of_day(value) for value in values]
+
+
+class PyQtGraphBackend(PlotBackend):
+    """
+    Fast CPU backend based on pyqtgraph
+
+    Curves are clipped to the visible range and peak-decimated to the screen
+    resolution, so panning stays smooth with millions of samples. Spans are
+    selected with Shift + left drag.
+    """
+    name = 'pyqtgraph'
+    label = "Schnell (pyqtgraph)"
+
+    # Map matplotlib line styles from get_line_style to Qt pen styles
+    PEN_STYLES = {
+        '-': Qt.SolidLine,
+        '--': Qt.DashLine,
+        '-.': Qt.DashDotLine,
+        ':': Qt.DotLine
+    }
+
+    def __init__(self, parent, on_select):
+        super().__init__(parent, on_select)
+        pg.setConfigOptions(antialias=False, useOpenGL=False, background='w', foreground='k')
+        self.widget = pg.GraphicsLayoutWidget(parent)
+        self.plot_item = None
+        self.extra_views = []
+        self.region = None
+        self.axes = {}
+
+    @classmethod
+    def is_available(cls):
+        return pg is not None
+
+    def widgets(self):
+        return [self.widget]
+
+    def show_empty(self, title):
+        self._reset(None)
+        self.plot_item.setTitle(title)
+
+    def _reset(self, x_column):
+        # Views of the extra axes live directly in the scene
+        for view in self.extra_views:
+            view.clear()
+            view.scene().removeItem(view)
+        self.extra_views = []
+        self.axes = {}
+        if self.plot_item is not None:
+            self.plot_item.clear()
+        self.widget.clear()
+
+        axis_items = {}
+        if x_column == 'timestamp_numeric':
+            axis_items['bottom'] = pg.DateAxisItem(orientation='bottom')
+        elif x_column == 'time_of_day_numeric':
+            axis_items['bottom'] = _TimeOfDayAxisItem(orientation='bottom')
+
+        view_box = _SpanViewBox(self._on_span)
+        self.plot_item = self.widget.addPlot(viewBox=view_box, axisItems=axis_items)
+        self.plot_item.showGrid(x=True, y=True, alpha=0.3)
+        self.plot_item.vb.sigResized.connect(self._update_views)
+
+        self.region = pg.LinearRegionItem(brush=pg.mkBrush(0, 0, 255, 50), movable=True)
+        self.region.setZValue(-10)
+        self.region.hide()
+        self.region.sigRegionChangeFinished.connect(self._on_region_changed)
+        self.plot_item.addItem(self.region, ignoreBounds=True)
+
+    def _update_views(self):
+        main_view = self.plot_item.vb
+        for view in self.extra_views:
+            view.setGeometry(main_view.sceneBoundingRect())
+            view.linkedViewChanged(main_view, view.XAxis)
+
+    def _on_span(self, xmin, xmax, finished):
+        # Report the span once when the drag is finished, not on every move
+        self.region.blockSignals(True)
+        self.region.setRegion((xmin, xmax))
+        self.region.blockSignals(False)
+        self.region.show()
+        if finished:
+            self.on_select(xmin, xmax)
+
+    def _on_region_changed(self):
+        if self.region.isVisible():
+            xmin, xmax = self.region.getRegion()
+            self.on_select(xmin, xmax)
+
+    def _add_curve(self, view, series, color):
+        df = series['df']
+        if series.get('index') is not None:
+            df = df.iloc[series['index']]
+        pen = pg.mkPen(color, width=1, style=self.PEN_STYLES.get(series['line_style'], Qt.SolidLine))
+        try:
+            x = df[series['x_column']].to_numpy(dtype=np.float64)
+            y = df[series['y_column']].to_numpy(dtype=np.float64)
+        except (TypeError, ValueError) as e:
+            print(f"Fehler beim Plotten von {series['y_column']} für {series['file_name']}: {e}")
+            return None
+
+        curve = pg.PlotDataItem(x, y, pen=pen, name=series['label'])
+        view.addItem(curve)
+        # Enable after adding, clipping needs the view box of the curve
+        curve.setDownsampling(auto=True, method='peak')
+        curve.setClipToView(True)
+        return curve
+
+    def render(self, model, x_column, span_start=None, span_end=None):
+        self._reset(x_column)
+        legend = self.plot_item.addLegend(offset=(10, 10))
+        self.plot_item.setTitle('Trainingsdaten')
+        self.plot_item.setLabel('bottom', get_x_label(x_column))
+
+        for i, axis in enumerate(model):
+            y_column = axis['column']
+            color = axis['color']
+
+            if i == 0:
+                # First dataset uses the main left y-axis
+                view = self.plot_item.vb
+                axis_item = self.plot_item.getAxis('left')
+            else:
+                # Additional axes are stacked on the right, sharing the x range
+                view = pg.ViewBox()
+                self.plot_item.scene().addItem(view)
+                view.setXLink(self.plot_item.vb)
+                axis_item = pg.AxisItem('right')
+                self.plot_item.layout.addItem(axis_item, 2, 2 + i)
+                axis_item.linkToView(view)
+                self.extra_views.append(view)
+
+            axis_item.setLabel(y_column, color=color)
+            axis_item.setPen(pg.mkPen(color))
+            axis_item.setTextPen(pg.mkPen(color))
+            self.axes[y_column] = view
+
+            for series in axis['series']:
+                curve = self._add_curve(view, series, color)
+                # Curves are added to the view boxes directly, which skips the legend
+                if curve is not None:
+                    legend.addItem(curve, series['label'])
+
+        self._update_views()
+
+        # Highlight selected region if any
+        if span_start is not None and span_end is not None:
+            self.region.blockSignals(True)
+            self.region.setRegion((span_start, span_end))
+            self.region.blockSignals(False)
+            self.region.show()
+
+
+PLOT_BACKENDS = {
+    MatplotlibBackend.name: MatplotlibBackend,
+    PyQtGraphBackend.name: PyQtGraphBackend
+}
+
+
+def create_plot_backend(name, parent, on_select):
+    """
+    Create the plot backend with the given name
+
+    Falls back to matplotlib if the requested backend is unknown or its
+    dependency is not installed.
+    """
+    backend_class = PLOT_BACKENDS.get(name, MatplotlibBackend)
+    if not backend_class.is_available():
+        print(f"Plot-Backend '{name}' ist nicht verfügbar, verwende matplotlib.")
+        backend_class = MatplotlibBackend
+    return backend_class(parent, on_select)
@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+DEFAULT_DEBOUNCE_MS = 100
+
+
+class RefreshScheduler(QObject):
+    """
+    Coalesces bursts of refresh requests and computes them on a worker thread
+
+    Every request restarts a short timer; when it fires, snapshot_fn takes a
+    copy of the UI state on the GUI thread, compute_fn runs on the worker
+    thread and apply_fn gets the result back on the GUI thread. Results of
+    requests that were superseded by newer ones are dropped.
+    """
+    result_ready = pyqtSignal(int, object)
+
+    def __init__(self, snapshot_fn, compute_fn, apply_fn, debounce_ms=DEFAULT_DEBOUNCE_MS, parent=None):
+        super().__init__(parent)
+        self.snapshot_fn = snapshot_fn
+        self.compute_fn = compute_fn
+        self.apply_fn = apply_fn
+        self.generation = 0
+        self.pending_plot = False
+        self.pending_stats = False
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self._start)
+
+        # Emitted from the worker thread, delivered queued on the GUI thread
+        self.result_ready.connect(self._finish)
+
+    def request(self, plot=True, stats=True):
+        """
+        Schedule a refresh of the plot and/or the statistics
+        """
+        self.pending_plot |= plot
+        self.pending_stats |= stats
+        # Invalidate running computations right away
+        self.generation += 1
+        self.timer.start()
+
+    def _start(self):
+        generation = self.generation
+        # Pending flags stay set until a result is applied, so a dropped
+        # plot refresh is redone by the request that superseded it
+        state = self.snapshot_fn(self.pending_plot, self.pending_stats)
+        self.executor.submit(self._compute, generation, state)
+
+    def _compute(self, generation, state):
+        # Skip requests that became stale while waiting for the worker
+        if generation != self.generation:
+            return
+        try:
+            result = self.compute_fn(state)
+        except Exception as e:
+            print(f"Fehler bei der Berechnung: {e}")
+            return
+        self.result_ready.emit(generation, result)
+
+    def _finish(self, generation, result):
+        if generation == self.generation:
+            self.pending_plot = False
+            self.pending_stats = False
+            self.apply_fn(result)
+
+    def shutdown(self):
+        self.timer.stop()
+        self.generation += 1
+        self.executor.shutdown(wait=False)
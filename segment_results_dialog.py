@@ -0,0 +1,50 @@
+import numpy as np
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtWidgets import QDialog, QLabel, QTableWidget, QTableWidgetItem, QVBoxLayout, QHeaderView
+
+class SegmentResultsDialog(QDialog):
+    """
+    Ranked table of all traversals of a segment found in the archive
+    Double-clicking a row asks to load the ride.
+    """
+    load_requested = pyqtSignal(str)
+
+    HEADERS = ["Rang", "Datei", "Datum", "Zeit", "Ø Leistung", "Ø Herzfrequenz"]
+
+    def __init__(self, results, segment_length_m, parent=None):
+        super().__init__(parent)
+        self.results = results
+        self.setWindowTitle("Segment-Vergleich")
+        self.resize(700, 400)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(f"{len(results)} Durchfahrten gefunden, Segmentlänge {segment_length_m / 1000:.2f} km"))
+
+        self.table = QTableWidget(len(results), len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+
+        for row, result in enumerate(results.itertuples()):
+            seconds = int(round(result.seconds))
+            values = [
+                str(row + 1),
+                result.file,
+                result.start.strftime('%d.%m.%Y %H:%M'),
+                f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}",
+                f"{result.avg_power:.0f} W" if np.isfinite(result.avg_power) else "--",
+                f"{result.avg_heart_rate:.0f}" if np.isfinite(result.avg_heart_rate) else "--"
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column != 1:
+                    item.setTextAlignment(Qt.AlignCenter)
+                self.table.setItem(row, column, item)
+
+        self.table.cellDoubleClicked.connect(self.on_double_click)
+        layout.addWidget(self.table)
+
+    def on_double_click(self, row, column):
+        self.load_requested.emit(self.results['path'].iloc[row])
@@ -0,0 +1,369 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from utils import parse_fit_file
+
+# Grid cell size of the spatial index, about 110 m in latitude
+CELL_DEGREES = 0.001
+# Maximum distance between a ride and the segment for a match
+MATCH_TOLERANCE_M = 30.0
+# Number of points along the segment a traversal has to pass
+CHECKPOINTS = 20
+# A traversal may be at most this much longer than the segment
+MAX_LENGTH_RATIO = 1.5
+
+INDEX_DIR_NAME = '.fit_analyse_index'
+INDEX_VERSION = 1
+EARTH_RADIUS_M = 6371000.0
+
+# Compact per ride track stored in the index
+TRACK_DTYPE = np.dtype([('t', '<f8'), ('lat', '<f4'), ('lon', '<f4'),
+                        ('power', '<f4'), ('heart_rate', '<f4')])
+
+
+def to_degrees(values):
+    """
+    Convert FIT positions to degrees, FIT files store them in semicircles
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if np.nanmax(np.abs(values), initial=0) > 180:
+        return values * (180.0 / 2**31)
+    return values
+
+
+def extract_track(df):
+    """
+    Return the GPS track of a parsed FIT file as TRACK_DTYPE array or None without positions
+    """
+    if df is None or 'position_lat' not in df.columns or 'position_long' not in df.columns:
+        return None
+    if 'timestamp_numeric' not in df.columns:
+        return None
+
+    lat = to_degrees(pd.to_numeric(df['position_lat'], errors='coerce'))
+    lon = to_degrees(pd.to_numeric(df['position_long'], errors='coerce'))
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    if not valid.any():
+        return None
+
+    track = np.empty(int(valid.sum()), dtype=TRACK_DTYPE)
+    track['t'] = df['timestamp_numeric'].to_numpy(dtype=np.float64)[valid]
+    track['lat'] = lat[valid]
+    track['lon'] = lon[valid]
+    for column in ('power', 'heart_rate'):
+        if column in df.columns:
+            track[column] = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)[valid]
+        else:
+            track[column] = np.nan
+    return track
+
+
+def segment_from_span(df, x_column, x_min, x_max):
+    """
+    Return the track of the span x_min..x_max of a loaded file, or None without GPS data
+    """
+    track = extract_track(df)
+    if track is None or x_column not in df.columns:
+        return track
+
+    # extract_track dropped the rows without position, apply the same mask to x
+    lat = to_degrees(pd.to_numeric(df['position_lat'], errors='coerce'))
+    lon = to_degrees(pd.to_numeric(df['position_long'], errors='coerce'))
+    x = df[x_column].to_numpy(dtype=np.float64)[np.isfinite(lat) & np.isfinite(lon)]
+    return track[(x >= x_min) & (x <= x_max)]
+
+
+def distances_m(lat, lon, lat0, lon0):
+    """
+    Distance in meters from every point to (lat0, lon0), equirectangular approximation
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    x = np.radians(lon - lon0) * np.cos(np.radians((lat + lat0) / 2))
+    y = np.radians(lat - lat0)
+    return EARTH_RADIUS_M * np.hypot(x, y)
+
+
+def path_length_m(lat, lon):
+    if len(lat) < 2:
+        return 0.0
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    x = np.radians(np.diff(lon)) * np.cos(np.radians((lat[1:] + lat[:-1]) / 2))
+    y = np.radians(np.diff(lat))
+    return float(EARTH_RADIUS_M * np.hypot(x, y).sum())
+
+
+def cell_keys(lat, lon):
+    """
+    Return the grid cell key of every point
+    """
+    lat_index = np.floor(np.asarray(lat, dtype=np.float64) / CELL_DEGREES).astype(np.int64)
+    lon_index = np.floor(np.asarray(lon, dtype=np.float64) / CELL_DEGREES).astype(np.int64)
+    return (lat_index + 2**20) * 2**21 + (lon_index + 2**20)
+
+
+def _neighbour_keys(lat, lon):
+    """
+    Return the cell keys around a point, so matches near a cell border are found
+    """
+    keys = []
+    for d_lat in (-1, 0, 1):
+        for d_lon in (-1, 0, 1):
+            keys.append(cell_keys(lat + d_lat * CELL_DEGREES, lon + d_lon * CELL_DEGREES))
+    return np.unique(np.concatenate([np.atleast_1d(key) for key in keys]))
+
+
+def _passes(track, lat0, lon0, tolerance):
+    """
+    Return the track index of the closest point of every pass within tolerance of a point
+    """
+    # Cheap bounding box test first, exact distances only for the points inside
+    d_lat = np.degrees(tolerance / EARTH_RADIUS_M)
+    d_lon = d_lat / max(np.cos(np.radians(lat0)), 1e-6)
+    near = np.flatnonzero((np.abs(track['lat'] - lat0) <= d_lat) & (np.abs(track['lon'] - lon0) <= d_lon))
+    if not len(near):
+        return near
+
+    distances = distances_m(track['lat'][near], track['lon'][near], lat0, lon0)
+    inside = distances <= tolerance
+    near = near[inside]
+    distances = distances[inside]
+    if not len(near):
+        return near
+
+    # Consecutive indices form one pass
+    run_starts = np.flatnonzero(np.diff(near, prepend=near[0] - 2) > 1)
+    run_ends = np.append(run_starts[1:], len(near))
+    return np.array([near[start + np.argmin(distances[start:end])] for start, end in zip(run_starts, run_ends)],
+                    dtype=np.int64)
+
+
+def match_segment(track, segment, tolerance=MATCH_TOLERANCE_M):
+    """
+    Find all traversals of a segment in a track
+
+    Args:
+        track: TRACK_DTYPE array of a ride
+        segment: TRACK_DTYPE array of the segment
+
+    Returns:
+        List of (start index, end index) into track
+    """
+    start_passes = _passes(track, segment['lat'][0], segment['lon'][0], tolerance)
+    end_passes = _passes(track, segment['lat'][-1], segment['lon'][-1], tolerance)
+    if not len(start_passes) or not len(end_passes):
+        return []
+
+    segment_length = path_length_m(segment['lat'], segment['lon'])
+    checkpoints = segment[np.linspace(0, len(segment) - 1, min(CHECKPOINTS, len(segment))).astype(int)]
+
+    matches = []
+    for i, start in enumerate(start_passes):
+        following = np.searchsorted(end_passes, start, side='right')
+        if following == len(end_passes):
+            break
+        end = end_passes[following]
+
+        # A later start pass before this end is the better start
+        if i + 1 < len(start_passes) and start_passes[i + 1] < end:
+            continue
+
+        window = track[start:end + 1]
+        if path_length_m(window['lat'], window['lon']) > MAX_LENGTH_RATIO * segment_length + 2 * tolerance:
+            continue
+
+        # Every checkpoint must be passed, one row per checkpoint
+        lat = window['lat'].astype(np.float64)[np.newaxis, :]
+        lon = window['lon'].astype(np.float64)[np.newaxis, :]
+        c_lat = checkpoints['lat'].astype(np.float64)[:, np.newaxis]
+        c_lon = checkpoints['lon'].astype(np.float64)[:, np.newaxis]
+        if np.all(distances_m(lat, lon, c_lat, c_lon).min(axis=1) <= tolerance):
+            matches.append((int(start), int(end)))
+    return matches
+
+
+def _parse_track(path):
+    """
+    Parse a FIT file into its track, runs in a worker process
+    """
+    return extract_track(parse_fit_file(path))
+
+
+class SegmentIndex:
+    """
+    Persistent spatial index over all rides of an archive directory
+
+    Every ride's track is stored as a small .npy file; a grid over the track
+    points maps each cell to the rides passing it (CSR arrays in grid.npz).
+    Updates only parse FIT files that are new or changed since the last run.
+    """
+    def __init__(self, archive_dir):
+        self.archive_dir = Path(archive_dir)
+        self.index_dir = self.archive_dir / INDEX_DIR_NAME
+        self.tracks_dir = self.index_dir / 'tracks'
+        self.rides = {}  # ride id -> {'path', 'mtime', 'size'}
+        self.keys = np.empty(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.ride_ids = np.empty(0, dtype=np.int32)
+        self.load()
+
+    def load(self):
+        manifest_path = self.index_dir / 'manifest.json'
+        grid_path = self.index_dir / 'grid.npz'
+        if not manifest_path.exists() or not grid_path.exists():
+            return
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') != INDEX_VERSION or manifest.get('cell_degrees') != CELL_DEGREES:
+                return
+            with np.load(grid_path) as grid:
+                self.keys = grid['keys']
+                self.offsets = grid['offsets']
+                self.ride_ids = grid['ride_ids']
+            self.rides = {int(ride_id): ride for ride_id, ride in manifest['rides'].items()}
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Segment-Index wird neu aufgebaut: {e}")
+            self.rides = {}
+
+    def save(self):
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        np.savez(self.index_dir / 'grid.npz', keys=self.keys, offsets=self.offsets, ride_ids=self.ride_ids)
+        manifest = {'version': INDEX_VERSION, 'cell_degrees': CELL_DEGREES,
+                    'rides': {str(ride_id): ride for ride_id, ride in self.rides.items()}}
+        tmp_path = self.index_dir / 'manifest.json.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.index_dir / 'manifest.json')
+
+    def track_path(self, ride_id):
+        return self.tracks_dir / f"{ride_id}.npy"
+
+    def load_track(self, ride_id):
+        return np.load(self.track_path(ride_id))
+
+    def update(self, progress=None, max_workers=None):
+        """
+        Bring the index up to date with the FIT files of the archive
+
+        Args:
+            progress: Optional callback progress(done, total, message)
+        """
+        files = {}
+        for path in self.archive_dir.rglob('*'):
+            if path.suffix.lower() == '.fit' and INDEX_DIR_NAME not in path.parts:
+                stat = path.stat()
+                files[str(path)] = {'path': str(path), 'mtime': stat.st_mtime, 'size': stat.st_size}
+
+        known = {ride['path']: ride_id for ride_id, ride in self.rides.items()}
+        removed = {ride_id for path, ride_id in known.items()
+                   if path not in files or files[path]['mtime'] != self.rides[ride_id]['mtime']
+                   or files[path]['size'] != self.rides[ride_id]['size']}
+        to_parse = [path for path in files if path not in known or known[path] in removed]
+        if not removed and not to_parse:
+            return
+
+        # Keep the grid entries of unchanged rides
+        pair_keys = np.repeat(self.keys, np.diff(self.offsets))
+        keep = ~np.isin(self.ride_ids, list(removed))
+        pair_keys = [pair_keys[keep]]
+        pair_rides = [self.ride_ids[keep]]
+        for ride_id in removed:
+            del self.rides[ride_id]
+            if self.track_path(ride_id).exists():
+                os.remove(self.track_path(ride_id))
+
+        self.tracks_dir.mkdir(parents=True, exist_ok=True)
+        next_id = max(self.rides, default=-1) + 1
+        if to_parse:
+            max_workers = max_workers or min(len(to_parse), os.cpu_count() or 1)
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+                futures = {executor.submit(_parse_track, path): path for path in to_parse}
+                for done, future in enumerate(as_completed(futures), start=1):
+                    path = futures[future]
+                    try:
+                        track = future.result()
+                    except Exception as e:
+                        print(f"Fehler beim Indizieren von {path}: {e}")
+                        track = None
+
+                    # Rides without GPS are recorded too, so they are not parsed again
+                    ride_id = next_id
+                    next_id += 1
+                    self.rides[ride_id] = files[path]
+                    if track is not None and len(track):
+                        np.save(self.track_path(ride_id), track)
+                        keys = np.unique(cell_keys(track['lat'], track['lon']))
+                        pair_keys.append(keys)
+                        pair_rides.append(np.full(len(keys), ride_id, dtype=np.int32))
+                    if progress is not None:
+                        progress(done, len(to_parse), Path(path).name)
+
+        # Rebuild the CSR arrays, sorted by cell key
+        pair_keys = np.concatenate(pair_keys)
+        pair_rides = np.concatenate(pair_rides)
+        order = np.lexsort((pair_rides, pair_keys))
+        pair_keys = pair_keys[order]
+        self.ride_ids = pair_rides[order].astype(np.int32)
+        self.keys, counts = np.unique(pair_keys, return_counts=True)
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self.save()
+
+    def rides_in_cells(self, keys):
+        """
+        Return the ids of all rides passing one of the given cells
+        """
+        positions = np.searchsorted(self.keys, keys)
+        inside = positions < len(self.keys)
+        positions = positions[inside]
+        positions = positions[self.keys[positions] == keys[inside]]
+        if not len(positions):
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate([self.ride_ids[self.offsets[p]:self.offsets[p + 1]] for p in positions]))
+
+    def search(self, segment, tolerance=MATCH_TOLERANCE_M):
+        """
+        Find all traversals of a segment in the archive
+
+        Args:
+            segment: TRACK_DTYPE array, e.g. from segment_from_span
+
+        Returns:
+            DataFrame with one row per traversal, ranked by time
+        """
+        columns = ['file', 'path', 'start', 'seconds', 'avg_power', 'avg_heart_rate']
+        if segment is None or len(segment) < 2:
+            return pd.DataFrame(columns=columns)
+
+        # Candidates pass near the start and near the end of the segment
+        candidates = np.intersect1d(
+            self.rides_in_cells(_neighbour_keys(segment['lat'][0], segment['lon'][0])),
+            self.rides_in_cells(_neighbour_keys(segment['lat'][-1], segment['lon'][-1])))
+
+        rows = []
+        for ride_id in candidates:
+            ride = self.rides.get(int(ride_id))
+            if ride is None or not self.track_path(ride_id).exists():
+                continue
+            track = self.load_track(ride_id)
+            for start, end in match_segment(track, segment, tolerance):
+                window = track[start:end + 1]
+                rows.append({
+                    'file': Path(ride['path']).stem,
+                    'path': ride['path'],
+                    'start': window['t'][0],
+                    'seconds': float(window['t'][-1] - window['t'][0]),
+                    'avg_power': float(np.nanmean(window['power'])) if np.isfinite(window['power']).any() else np.nan,
+                    'avg_heart_rate': float(np.nanmean(window['heart_rate'])) if np.isfinite(window['heart_rate']).any() else np.nan
+                })
+
+        results = pd.DataFrame(rows, columns=columns)
+        results['start'] = pd.to_datetime(results['start'], unit='s')
+        return results.sort_values('seconds', kind='stable').reset_index(drop=True)
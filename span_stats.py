@@ -0,0 +1,237 @@
+import numpy as np
+import pandas as pd
+
+# Zone boundaries as fractions of FTP (Coggan power zones)
+POWER_ZONES = [0.55, 0.75, 0.90, 1.05, 1.20, 1.50]
+# Zone boundaries as fractions of the maximum heart rate
+HEART_RATE_ZONES = [0.60, 0.70, 0.80, 0.90]
+
+DEFAULT_FTP = 250
+DEFAULT_MAX_HEART_RATE = 190
+
+
+def get_zone_bounds(column, ftp=DEFAULT_FTP, max_heart_rate=DEFAULT_MAX_HEART_RATE):
+    """
+    Return the absolute zone boundaries for a channel or None if it has no zones
+    """
+    if column == 'power':
+        return [ftp * fraction for fraction in POWER_ZONES]
+    if column == 'heart_rate':
+        return [max_heart_rate * fraction for fraction in HEART_RATE_ZONES]
+    return None
+
+
+class ChannelHistogram:
+    """
+    Cumulative histogram of one channel, ordered by the x column
+
+    The rows are sorted by x, so every span x_min..x_max is a contiguous row
+    range. Prefix counts per bin are stored every BLOCK_SIZE rows; the counts
+    of any span are the difference of two prefix rows plus the bin counts of
+    at most two partial blocks, so no sorting is needed per span.
+    """
+    BLOCK_SIZE = 128
+    MAX_BINS = 256
+    # Integer channels with at most this many distinct values get exact unit bins
+    MAX_UNIT_BINS = 2048
+    # Values below and above these percentiles of the file go to the outer bins
+    OUTLIER_PERCENT = 0.1
+    # Spans up to this many rows get exact percentiles
+    EXACT_SPAN_ROWS = 2 * BLOCK_SIZE
+
+    def __init__(self, x, values, seconds_per_sample=1.0):
+        x = np.asarray(x, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+
+        order = np.argsort(x, kind='stable')
+        self.x = x[order]
+        self.values = values[order]
+        self.seconds_per_sample = seconds_per_sample
+
+        finite = np.isfinite(self.values)
+        if finite.any():
+            v_min = np.min(self.values[finite])
+            v_max = np.max(self.values[finite])
+            # The bins cover the bulk of the data, so single glitches (GPS speed
+            # spikes, invalid sensor values) do not stretch them
+            lo, hi = np.percentile(self.values[finite], [self.OUTLIER_PERCENT, 100 - self.OUTLIER_PERCENT])
+        else:
+            v_min = v_max = lo = hi = 0.0
+
+        # Exact bins for integer valued channels like power or heart rate
+        integer_valued = finite.any() and np.all(self.values[finite] == np.round(self.values[finite]))
+        if integer_valued and np.ceil(hi) - np.floor(lo) + 1 <= self.MAX_UNIT_BINS:
+            self.unit_bins = True
+            inner = np.arange(np.floor(lo), np.ceil(hi) + 2) - 0.5
+        else:
+            self.unit_bins = False
+            inner = np.linspace(lo, hi if hi > lo else lo + 1, self.MAX_BINS + 1)
+        # First and last bin collect the values outside the bulk (may be empty)
+        self.edges = np.concatenate(([min(v_min, inner[0])], inner, [max(v_max, inner[-1])]))
+        self.n_bins = len(self.edges) - 1
+
+        # Bin index per row, invalid values go to an extra overflow bin
+        bins = np.searchsorted(self.edges, self.values, side='right') - 1
+        bins = np.clip(bins, 0, self.n_bins - 1)
+        bins[~finite] = self.n_bins
+        self.bins = bins.astype(np.int32)
+
+        # Prefix counts at every block boundary
+        n_blocks = len(self.bins) // self.BLOCK_SIZE
+        block_counts = np.zeros((n_blocks + 1, self.n_bins + 1), dtype=np.int32)
+        if n_blocks:
+            blocks = self.bins[:n_blocks * self.BLOCK_SIZE].reshape(n_blocks, self.BLOCK_SIZE)
+            rows = np.repeat(np.arange(1, n_blocks + 1), self.BLOCK_SIZE)
+            np.add.at(block_counts, (rows, blocks.ravel()), 1)
+        self.prefix = np.cumsum(block_counts, axis=0, dtype=np.int32)
+
+        # Prefix sums for the mean, invalid values count as zero
+        self.value_sums = np.concatenate(([0.0], np.cumsum(np.where(finite, self.values, 0.0))))
+        self.valid_counts = np.concatenate(([0], np.cumsum(finite)))
+
+    @classmethod
+    def from_dataframe(cls, df, x_column, column):
+        """
+        Build the histogram of a DataFrame column ordered by x_column
+        Without a numeric x column the rows keep their order and spans cover all data.
+
+        Returns:
+            ChannelHistogram or None if the column is missing or not numeric
+        """
+        if column not in df.columns or not pd.api.types.is_numeric_dtype(df[column]):
+            return None
+
+        if x_column in df.columns and pd.api.types.is_numeric_dtype(df[x_column]):
+            x = df[x_column].to_numpy(dtype=np.float64)
+        else:
+            x = np.arange(len(df), dtype=np.float64)
+
+        # Duration of one record, FIT files are usually recorded at 1 Hz
+        seconds_per_sample = 1.0
+        if 'timestamp_numeric' in df.columns and len(df) > 1:
+            step = np.median(np.diff(df['timestamp_numeric'].to_numpy(dtype=np.float64)))
+            if np.isfinite(step) and step > 0:
+                seconds_per_sample = float(step)
+
+        return cls(x, df[column].to_numpy(dtype=np.float64), seconds_per_sample)
+
+    # Arrays that make up a histogram, used to store it in a workspace
+    ARRAY_FIELDS = ('x', 'values', 'edges', 'bins', 'prefix', 'value_sums', 'valid_counts')
+
+    def to_arrays(self):
+        """
+        Returns (dictionary of arrays, JSON serializable metadata)
+        """
+        fields = {field: getattr(self, field) for field in self.ARRAY_FIELDS}
+        meta = {'unit_bins': bool(self.unit_bins), 'seconds_per_sample': self.seconds_per_sample}
+        return fields, meta
+
+    @classmethod
+    def from_arrays(cls, fields, meta):
+        """
+        Restore a histogram from to_arrays() output without recomputing it
+        """
+        histogram = cls.__new__(cls)
+        for field in cls.ARRAY_FIELDS:
+            setattr(histogram, field, fields[field])
+        histogram.unit_bins = meta['unit_bins']
+        histogram.seconds_per_sample = meta['seconds_per_sample']
+        histogram.n_bins = len(histogram.edges) - 1
+        return histogram
+
+    def span_indices(self, x_min=None, x_max=None):
+        """
+        Return the row range [lo, hi) of the sorted rows inside x_min..x_max (inclusive)
+        """
+        lo = 0 if x_min is None else int(np.searchsorted(self.x, x_min, side='left'))
+        hi = len(self.x) if x_max is None else int(np.searchsorted(self.x, x_max, side='right'))
+        return lo, max(lo, hi)
+
+    def counts(self, lo, hi):
+        """
+        Return the bin counts of the sorted rows [lo, hi)
+        """
+        size = self.BLOCK_SIZE
+        first_block = -(-lo // size)
+        last_block = hi // size
+
+        if first_block >= last_block:
+            counts = np.bincount(self.bins[lo:hi], minlength=self.n_bins + 1)
+        else:
+            counts = (self.prefix[last_block] - self.prefix[first_block] +
+                      np.bincount(self.bins[lo:first_block * size], minlength=self.n_bins + 1) +
+                      np.bincount(self.bins[last_block * size:hi], minlength=self.n_bins + 1))
+        # Drop the overflow bin of invalid values
+        return counts[:self.n_bins]
+
+    def bin_centers(self):
+        return (self.edges[:-1] + self.edges[1:]) / 2
+
+    def percentile(self, counts, q, span_values=None):
+        """
+        Return the q-th percentile (0-100) for the given bin counts
+
+        The outer bins have no useful width, a percentile falling into them
+        is computed exactly from span_values if given. So are the percentiles
+        of short spans, where bins are coarser than the gaps between values.
+        """
+        total = counts.sum()
+        if total == 0:
+            return None
+
+        cumulative = np.cumsum(counts)
+        target = q / 100 * (total - 1)
+        idx = int(np.searchsorted(cumulative, target, side='right'))
+        idx = min(idx, self.n_bins - 1)
+
+        if span_values is not None and (idx in (0, self.n_bins - 1) or len(span_values) <= self.EXACT_SPAN_ROWS):
+            return float(np.nanpercentile(span_values, q))
+        if self.unit_bins:
+            return float(self.edges[idx] + 0.5)
+
+        # Interpolate linearly inside the bin
+        before = cumulative[idx - 1] if idx > 0 else 0
+        fraction = (target - before + 0.5) / counts[idx] if counts[idx] else 0.5
+        width = self.edges[idx + 1] - self.edges[idx]
+        return float(self.edges[idx] + min(max(fraction, 0.0), 1.0) * width)
+
+    def zone_counts(self, counts, zone_bounds):
+        """
+        Return the sample counts per zone, zone i covers zone_bounds[i-1]..zone_bounds[i]
+        """
+        zone_of_bin = np.searchsorted(zone_bounds, self.bin_centers(), side='right')
+        return np.bincount(zone_of_bin, weights=counts, minlength=len(zone_bounds) + 1).astype(np.int64)
+
+    def summary(self, x_min=None, x_max=None, zone_bounds=None):
+        """
+        Compute the statistics of a span
+
+        Args:
+            x_min: Start of the span in x column units or None for all data
+            x_max: End of the span in x column units or None for all data
+            zone_bounds: Absolute zone boundaries or None
+
+        Returns:
+            Dictionary with mean, min, max, p5, median, p95, the bin counts and
+            zone times in seconds, or None if the span has no valid values
+        """
+        lo, hi = self.span_indices(x_min, x_max)
+        valid = self.valid_counts[hi] - self.valid_counts[lo]
+        if valid == 0:
+            return None
+
+        counts = self.counts(lo, hi)
+        span_values = self.values[lo:hi]
+        stats = {
+            'mean': (self.value_sums[hi] - self.value_sums[lo]) / valid,
+            'min': float(np.nanmin(span_values)),
+            'max': float(np.nanmax(span_values)),
+            'p5': self.percentile(counts, 5, span_values),
+            'median': self.percentile(counts, 50, span_values),
+            'p95': self.percentile(counts, 95, span_values),
+            'counts': counts,
+            'zone_seconds': None
+        }
+        if zone_bounds is not None:
+            stats['zone_seconds'] = self.zone_counts(counts, zone_bounds) * self.seconds_per_sample
+        return stats
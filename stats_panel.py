@@ -1,14 +1,59 @@
 import numpy as np
 import pandas as pd
 from PyQt5.QtCore import Qt
-from PyQt5.QtWidgets import QFrame, QGridLayout, QLabel
-from utils import safe_numeric_filter
+from PyQt5.QtGui import QColor, QPainter
+from PyQt5.QtWidgets import QFrame, QGridLayout, QLabel, QWidget
+from span_stats import ChannelHistogram, get_zone_bounds, DEFAULT_FTP, DEFAULT_MAX_HEART_RATE
+from utils import get_axis_color
+
+class DistributionChart(QWidget):
+    """
+    Small bar chart of the value distribution (or the zone times) of a span
+    """
+    MAX_BARS = 32
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.bars = []
+        self.colors = []
+        self.setFixedHeight(48)
+        
+    def set_bars(self, bars, colors=None):
+        self.bars = list(bars)
+        self.colors = colors or []
+        self.update()
+        
+    def set_distribution(self, counts):
+        # Merge neighbouring bins so the chart stays readable
+        counts = np.asarray(counts)
+        if len(counts) > self.MAX_BARS:
+            groups = np.array_split(counts, self.MAX_BARS)
+            counts = np.array([group.sum() for group in groups])
+        self.set_bars(counts)
+        
+    def paintEvent(self, event):
+        if not self.bars:
+            return
+        peak = max(self.bars)
+        if peak <= 0:
+            return
+        
+        painter = QPainter(self)
+        width = self.width() / len(self.bars)
+        height = self.height()
+        for i, value in enumerate(self.bars):
+            bar_height = int(height * value / peak)
+            color = self.colors[i] if i < len(self.colors) else '#7f7f7f'
+            painter.fillRect(int(i * width), height - bar_height, max(1, int(width) - 1), bar_height, QColor(color))
+        painter.end()
 
 class StatsPanel(QFrame):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setFrameShape(QFrame.StyledPanel)
         self.setFrameShadow(QFrame.Raised)
+        self.ftp = DEFAULT_FTP  # Functional threshold power for the power zones
+        self.max_heart_rate = DEFAULT_MAX_HEART_RATE  # Maximum heart rate for the HR zones
         self.init_ui()
         
     def init_ui(self):
@@ -58,6 +103,24 @@ class StatsPanel(QFrame):
         max_value = QLabel("--")
         box_layout.addWidget(max_value, 4, 2, alignment=Qt.AlignRight)
         
+        # Percentiles
+        p5_value = QLabel("P5: --")
+        box_layout.addWidget(p5_value, 5, 0, alignment=Qt.AlignLeft)
+        
+        median_value = QLabel("Median: --")
+        box_layout.addWidget(median_value, 5, 1, alignment=Qt.AlignCenter)
+        
+        p95_value = QLabel("P95: --")
+        box_layout.addWidget(p95_value, 5, 2, alignment=Qt.AlignRight)
+        
+        # Distribution or time in zones
+        chart = DistributionChart()
+        box_layout.addWidget(chart, 6, 0, 1, 3)
+        
+        zones_value = QLabel("")
+        zones_value.setWordWrap(True)
+        box_layout.addWidget(zones_value, 7, 0, 1, 3, alignment=Qt.AlignCenter)
+        
         # Add to main layout
         self.layout.addWidget(stats_frame, row, 0, 1, 3)
         
@@ -66,7 +129,12 @@ class StatsPanel(QFrame):
             'frame': stats_frame,
             'avg': avg_value,
             'min': min_value,
-            'max': max_value
+            'max': max_value,
+            'p5': p5_value,
+            'median': median_value,
+            'p95': p95_value,
+            'chart': chart,
+            'zones': zones_value
         }
         
     def remove_stats_box(self, key):
@@ -76,50 +144,72 @@ class StatsPanel(QFrame):
             self.stats_boxes[key]['frame'].deleteLater()
             del self.stats_boxes[key]
             
-    def update_stats(self, column_name, df, x_column, file_name=None, x_min=None, x_max=None):
+    def update_stats(self, column_name, df, x_column, file_name=None, x_min=None, x_max=None, histogram=None):
+        stats, integer_values = self.compute_stats(column_name, df, x_column, x_min, x_max, histogram)
+        self.show_stats(column_name, file_name, stats, integer_values)
+    
+    def compute_stats(self, column_name, df, x_column, x_min=None, x_max=None, histogram=None):
+        """
+        Compute the statistics of a column for the span x_min..x_max
+        Does not touch any widget, so it can run on a worker thread.
+        
+        Args:
+            histogram: Precomputed ChannelHistogram of the column ordered by x_column.
+                       Built on the fly if not given, callers should cache it.
+        
+        Returns:
+            Tuple (stats dictionary or None, True for integer formatting)
+        """
+        if histogram is None:
+            histogram = ChannelHistogram.from_dataframe(df, x_column, column_name)
+        if histogram is None:
+            return None, False
+        
+        # Without the x column there is nothing to filter by, use all data
+        if x_min is None or x_max is None or x_column not in df.columns:
+            x_min = x_max = None
+        zone_bounds = get_zone_bounds(column_name, self.ftp, self.max_heart_rate)
+        return histogram.summary(x_min, x_max, zone_bounds), histogram.unit_bins
+    
+    def show_stats(self, column_name, file_name, stats, integer_values=False):
+        """
+        Show statistics computed by compute_stats in the box of a column
+        """
         key = f"{column_name}_{file_name}" if file_name else column_name
         
         if key not in self.stats_boxes:
             self.add_stats_box(column_name, file_name)
         
-        filtered_df = df
-        
-        if x_min is not None and x_max is not None:
-            try:
-                # Handle timestamp specifically
-                if x_column == 'timestamp_numeric' and 'timestamp' in df.columns:
-                    # Filter using timestamp_numeric but keep the display format
-                    filtered_df = safe_numeric_filter(df, x_column, x_min, x_max)
-                elif x_column == 'time_of_day_numeric' and 'time_of_day' in df.columns:
-                    # Filter using time_of_day_numeric but keep the display format
-                    filtered_df = safe_numeric_filter(df, x_column, x_min, x_max)
-                else:
-                    # Standard numeric filtering
-                    filtered_df = safe_numeric_filter(df, x_column, x_min, x_max)
-            except Exception as e:
-                # Fall back to all data on error
-                print(f"Fehler beim Filtern der Daten: {e}")
-                filtered_df = df
-            
-        if len(filtered_df) > 0 and column_name in filtered_df.columns:
-            avg_val = filtered_df[column_name].mean()
-            min_val = filtered_df[column_name].min()
-            max_val = filtered_df[column_name].max()
+        box = self.stats_boxes[key]
             
-            # Format values based on type
-            if isinstance(avg_val, (int, np.integer)):
-                avg_str = f"{avg_val:.0f}"
-                min_str = f"{min_val:.0f}"
-                max_str = f"{max_val:.0f}"
+        if stats is not None:
+            # Format values based on type, the mean is never an integer
+            if integer_values:
+                fmt = "{:.0f}"
             else:
-                avg_str = f"{avg_val:.2f}"
-                min_str = f"{min_val:.2f}"
-                max_str = f"{max_val:.2f}"
+                fmt = "{:.2f}"
                 
-            self.stats_boxes[key]['avg'].setText(avg_str)
-            self.stats_boxes[key]['min'].setText(min_str)
-            self.stats_boxes[key]['max'].setText(max_str)
+            box['avg'].setText(f"{stats['mean']:.2f}")
+            box['min'].setText(fmt.format(stats['min']))
+            box['max'].setText(fmt.format(stats['max']))
+            box['p5'].setText("P5: " + fmt.format(stats['p5']))
+            box['median'].setText("Median: " + fmt.format(stats['median']))
+            box['p95'].setText("P95: " + fmt.format(stats['p95']))
+            
+            if stats['zone_seconds'] is not None:
+                zone_seconds = stats['zone_seconds']
+                box['chart'].set_bars(zone_seconds, [get_axis_color(i) for i in range(len(zone_seconds))])
+                box['zones'].setText(" | ".join(
+                    f"Z{i + 1} {int(seconds) // 60}:{int(seconds) % 60:02d}" for i, seconds in enumerate(zone_seconds)))
+            else:
+                box['chart'].set_distribution(stats['counts'])
+                box['zones'].setText("")
         else:
-            self.stats_boxes[key]['avg'].setText("--")
-            self.stats_boxes[key]['min'].setText("--")
-            self.stats_boxes[key]['max'].setText("--")
\ No newline at end of file
+            box['avg'].setText("--")
+            box['min'].setText("--")
+            box['max'].setText("--")
+            box['p5'].setText("P5: --")
+            box['median'].setText("Median: --")
+            box['p95'].setText("P95: --")
+            box['chart'].set_bars([])
+            box['zones'].setText("")
@@ -1,19 +1,21 @@
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import numpy as np
 import pandas as pd
 from pathlib import Path
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtWidgets import (QMainWindow, QVBoxLayout, QWidget,
                             QPushButton, QHBoxLayout, QLabel, QCheckBox, QMenu, QAction,
-                            QFileDialog, QSizePolicy, QMessageBox)
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-from matplotlib.widgets import SpanSelector
+                            QFileDialog, QSizePolicy, QMessageBox, QInputDialog, QProgressDialog)
 
+from memory_manager import MemoryBudget, dataset_size, remove_cache_file, spill_dataset
+from export import available_export_formats, export_datasets, span_frame
+from refresh_scheduler import RefreshScheduler
+from segment_results_dialog import SegmentResultsDialog
+from segment_search import SegmentIndex, path_length_m, segment_from_span
+from plot_backends import PLOT_BACKENDS, build_plot_model, create_plot_backend, get_display_column
+from span_stats import ChannelHistogram
 from stats_panel import StatsPanel
 # Use only the centralized functions from utils
-from utils import parse_fit_file, get_axis_color, get_line_style, safe_numeric_filter
+from utils import parse_fit_file
+from workspace import WORKSPACE_SUFFIX, load_workspace, save_workspace
 
 # Custom menu class that doesn't close on action trigger
 class PersistentMenu(QMenu):
@@ -25,17 +27,93 @@ class PersistentMenu(QMenu):
             return
         super().mouseReleaseEvent(event)
 
+class ExportThread(QThread):
+    """
+    Runs export_datasets in the background and reports its progress
+    """
+    progress = pyqtSignal(int, int, str)
+    
+    def __init__(self, jobs, out_dir, x_column, fmt, x_min, x_max, resample_step, parent=None):
+        super().__init__(parent)
+        self.jobs = jobs
+        self.out_dir = out_dir
+        self.x_column = x_column
+        self.fmt = fmt
+        self.x_min = x_min
+        self.x_max = x_max
+        self.resample_step = resample_step
+        self.cancelled = False
+        self.results = []
+        self.errors = []
+    
+    def run(self):
+        try:
+            self.results, self.errors = export_datasets(
+                self.jobs, self.out_dir, self.x_column, self.fmt, self.x_min, self.x_max,
+                self.resample_step, progress=self.progress.emit, is_cancelled=lambda: self.cancelled)
+        except Exception as e:
+            self.errors.append(str(e))
+
+class SpillThread(QThread):
+    """
+    Writes datasets to the memory cache in the background
+    The GUI thread swaps in the memory-mapped results when it is finished.
+    """
+    def __init__(self, jobs, parent=None):
+        super().__init__(parent)
+        self.jobs = jobs  # List of (file name, DataFrame, histograms, cache path)
+        self.results = []  # List of (file name, original DataFrame, cache path, mapped DataFrame, mapped histograms)
+    
+    def run(self):
+        for file_name, df, histograms, path in self.jobs:
+            try:
+                mapped_df, mapped_histograms = spill_dataset(path, df, histograms)
+            except Exception as e:
+                print(f"Fehler beim Auslagern von {file_name}: {e}")
+                remove_cache_file(path)
+                continue
+            self.results.append((file_name, df, path, mapped_df, mapped_histograms))
+
+class SegmentSearchThread(QThread):
+    """
+    Updates the archive index and searches a segment in the background
+    """
+    progress = pyqtSignal(int, int, str)
+    
+    def __init__(self, archive_dir, segment, parent=None):
+        super().__init__(parent)
+        self.archive_dir = archive_dir
+        self.segment = segment
+        self.results = None
+        self.error = None
+    
+    def run(self):
+        try:
+            index = SegmentIndex(self.archive_dir)
+            index.update(progress=self.progress.emit)
+            self.results = index.search(self.segment)
+        except Exception as e:
+            self.error = str(e)
+
 class TrainingPlotWindow(QMainWindow):
-    def __init__(self, dataframes):
+    def __init__(self, dataframes, plot_backend='matplotlib'):
         super().__init__()
         self.dataframes = dataframes  # List of dataframes
         self.selected_y_columns = {}  # Dictionary of selected y columns per file
         self.span_start = None
         self.span_end = None
-        self.axes = {}  # Store axes for each data series
         self.file_buttons = {}  # Store buttons for each file
         self.file_menus = {}  # Store menus for each file
         self.x_column = 'elapsed_time'  # Default x column
+        self.plot_backend_name = plot_backend  # Name of the plot backend to use
+        self.histograms = {}  # Cumulative histograms per (file, x column, column)
+        self.export_thread = None  # Running export, if any
+        self.memory_budget = MemoryBudget()  # Spills inactive datasets to disk
+        self.spill_thread = None  # Running spill, if any
+        self.archive_dir = None  # Ride archive for the segment search
+        self.segment_thread = None  # Running segment search, if any
+        self.refresh_scheduler = RefreshScheduler(self.snapshot_refresh_state, self.compute_refresh,
+                                                  self.apply_refresh, parent=self)
         self.initUI()
     
     def initUI(self):
@@ -58,10 +136,50 @@ class TrainingPlotWindow(QMainWindow):
         self.import_action.triggered.connect(self.add_file)
         self.menu.addAction(self.import_action)
         
+        # Workspace actions
+        self.open_workspace_action = QAction("Arbeitsbereich öffnen...", self)
+        self.open_workspace_action.triggered.connect(self.open_workspace)
+        self.menu.addAction(self.open_workspace_action)
+        
+        self.save_workspace_action = QAction("Arbeitsbereich speichern...", self)
+        self.save_workspace_action.triggered.connect(self.save_workspace)
+        self.menu.addAction(self.save_workspace_action)
+        
+        # Export action
+        self.export_action = QAction("Auswahl exportieren...", self)
+        self.export_action.triggered.connect(self.export_selection)
+        self.menu.addAction(self.export_action)
+        
+        # Segment search action
+        self.segment_action = QAction("Segment im Archiv suchen...", self)
+        self.segment_action.triggered.connect(self.search_segment)
+        self.menu.addAction(self.segment_action)
+        
         # X-axis submenu
         self.x_axis_menu = PersistentMenu("X-Achse wählen", self)
         self.menu.addMenu(self.x_axis_menu)
         
+        # Plot backend submenu
+        self.backend_menu = PersistentMenu("Darstellung", self)
+        for backend_class in PLOT_BACKENDS.values():
+            backend_action = QAction(backend_class.label, self, checkable=True)
+            backend_action.setData(backend_class.name)
+            backend_action.setChecked(backend_class.name == self.plot_backend_name)
+            backend_action.setEnabled(backend_class.is_available())
+            backend_action.triggered.connect(lambda checked, n=backend_class.name: self.set_plot_backend(checked, n))
+            self.backend_menu.addAction(backend_action)
+        self.menu.addMenu(self.backend_menu)
+        
+        # Zone settings
+        self.zones_action = QAction("Zonen einstellen...", self)
+        self.zones_action.triggered.connect(self.edit_zones)
+        self.menu.addAction(self.zones_action)
+        
+        # Memory budget setting
+        self.memory_budget_action = QAction("Speicherbudget...", self)
+        self.memory_budget_action.triggered.connect(self.edit_memory_budget)
+        self.menu.addAction(self.memory_budget_action)
+        
         # Add separator and exit action
         self.menu.addSeparator()
         self.exit_action = QAction("Beenden", self)
@@ -79,6 +197,10 @@ class TrainingPlotWindow(QMainWindow):
         
         controls_layout.addStretch(1)
         
+        # Memory usage against the budget
+        self.memory_label = QLabel()
+        controls_layout.addWidget(self.memory_label)
+        
         main_layout.addLayout(controls_layout)
         
         # File buttons layout - one button per file
@@ -92,12 +214,10 @@ class TrainingPlotWindow(QMainWindow):
         plot_widget = QWidget()
         plot_layout = QVBoxLayout(plot_widget)
         
-        self.figure, self.ax1 = plt.subplots(figsize=(10, 6))
-        self.canvas = FigureCanvas(self.figure)
-        plot_layout.addWidget(self.canvas)
-        
-        self.toolbar = NavigationToolbar(self.canvas, self)
-        plot_layout.addWidget(self.toolbar)
+        self.plot_backend = create_plot_backend(self.plot_backend_name, self, self.on_select)
+        for widget in self.plot_backend.widgets():
+            plot_layout.addWidget(widget)
+        self.plot_layout = plot_layout
         
         content_layout.addWidget(plot_widget, 7)
         
@@ -110,6 +230,7 @@ class TrainingPlotWindow(QMainWindow):
         self.populate_x_axis_menu()
         self.update_file_buttons()
         self.setup_span_selector()
+        self.manage_memory()
     
     def update_file_buttons(self):
         # Clear existing buttons
@@ -226,6 +347,7 @@ class TrainingPlotWindow(QMainWindow):
             self.selected_y_columns[file_name] = []
             
         if checked and column not in self.selected_y_columns[file_name]:
+            self.ensure_loaded(file_name)
             self.selected_y_columns[file_name].append(column)
             # Add stats box
             self.stats_panel.add_stats_box(column, file_name)
@@ -256,18 +378,20 @@ class TrainingPlotWindow(QMainWindow):
             self.setup_span_selector()
     
     def add_file(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, 'Wähle eine FIT-Datei', 
+                                                 str(Path.home()), 'FIT Dateien (*.fit)')
+        if file_path:
+            self.load_file(file_path)
+    
+    def load_file(self, file_path):
         try:
-            file_path, _ = QFileDialog.getOpenFileName(self, 'Wähle eine FIT-Datei', 
-                                                     str(Path.home()), 'FIT Dateien (*.fit)')
-            if not file_path:
-                return
-            
             # Use the centralized parsing function
             df = parse_fit_file(file_path)
             
             if df is not None and not df.empty:
                 # Add to dataframes list
                 self.dataframes.append(df)
+                self.memory_budget.touch(df['file_source'].iloc[0])
                 
                 # Update UI
                 self.update_file_buttons()
@@ -278,6 +402,213 @@ class TrainingPlotWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Fehler", f"Fehler beim Laden der Datei: {e}")
 
+    def save_workspace(self):
+        try:
+            file_path, _ = QFileDialog.getSaveFileName(self, 'Arbeitsbereich speichern',
+                                                       str(Path.home()), f'Arbeitsbereich (*{WORKSPACE_SUFFIX})')
+            if not file_path:
+                return
+            if not file_path.endswith(WORKSPACE_SUFFIX):
+                file_path += WORKSPACE_SUFFIX
+            
+            state = {
+                'x_column': self.x_column,
+                'selected_y_columns': self.selected_y_columns,
+                'span_start': self.span_start,
+                'span_end': self.span_end,
+                'plot_backend': self.plot_backend.name,
+                'ftp': self.stats_panel.ftp,
+                'max_heart_rate': self.stats_panel.max_heart_rate
+            }
+            save_workspace(file_path, self.dataframes, state, self.histograms)
+        except Exception as e:
+            QMessageBox.critical(self, "Fehler", f"Fehler beim Speichern des Arbeitsbereichs: {e}")
+    
+    def open_workspace(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, 'Arbeitsbereich öffnen',
+                                                   str(Path.home()), f'Arbeitsbereich (*{WORKSPACE_SUFFIX})')
+        if file_path:
+            self.load_workspace(file_path)
+    
+    def load_workspace(self, file_path):
+        """
+        Replace the current session with the datasets and UI state of a workspace file
+        """
+        try:
+            dataframes, state, histograms = load_workspace(file_path)
+        except Exception as e:
+            QMessageBox.critical(self, "Fehler", f"Fehler beim Öffnen des Arbeitsbereichs: {e}")
+            return
+        
+        # Remove stats boxes of the current session
+        for file_name, columns in self.selected_y_columns.items():
+            for col in columns:
+                self.stats_panel.remove_stats_box(f"{col}_{file_name}")
+        
+        self.wait_for_spill()
+        self.memory_budget.cleanup()
+        self.dataframes = dataframes
+        self.histograms = histograms
+        self.selected_y_columns = state.get('selected_y_columns', {})
+        self.x_column = state.get('x_column', self.x_column)
+        self.stats_panel.ftp = state.get('ftp', self.stats_panel.ftp)
+        self.stats_panel.max_heart_rate = state.get('max_heart_rate', self.stats_panel.max_heart_rate)
+        
+        backend_name = state.get('plot_backend', self.plot_backend.name)
+        if backend_name != self.plot_backend.name:
+            self.set_plot_backend(True, backend_name)
+        
+        self.span_start = state.get('span_start')
+        self.span_end = state.get('span_end')
+        self.reset_selection_btn.setEnabled(self.span_start is not None)
+        
+        for file_name, columns in self.selected_y_columns.items():
+            for col in columns:
+                self.stats_panel.add_stats_box(col, file_name)
+        
+        # Update UI
+        self.update_file_buttons()
+        self.populate_x_axis_menu()
+        self.plot_data()
+    
+    def export_selection(self):
+        """
+        Export the current span of the selected columns of every loaded file
+        """
+        jobs = []
+        for df in self.dataframes:
+            if df.empty or 'file_source' not in df.columns:
+                continue
+            file_name = df['file_source'].iloc[0]
+            columns = self.selected_y_columns.get(file_name, [])
+            if columns:
+                jobs.append((file_name, df, list(columns)))
+        
+        if not jobs:
+            QMessageBox.information(self, "Export", "Keine Y-Spalten zum Exportieren ausgewählt.")
+            return
+        if self.export_thread is not None and self.export_thread.isRunning():
+            QMessageBox.information(self, "Export", "Es läuft bereits ein Export.")
+            return
+        
+        out_dir = QFileDialog.getExistingDirectory(self, 'Zielverzeichnis wählen', str(Path.home()))
+        if not out_dir:
+            return
+        
+        fmt, ok = QInputDialog.getItem(self, "Export", "Format:", available_export_formats(), 0, False)
+        if not ok:
+            return
+        
+        resample_step, ok = QInputDialog.getDouble(
+            self, "Export", f"Schrittweite für Neuabtastung in {self.x_column} (0 = Rohdaten):", 0, 0, 1e9, 3)
+        if not ok:
+            return
+        
+        # Only the span and the exported columns are sent to the worker processes
+        sources = []
+        for file_name, df, columns in jobs:
+            source = span_frame(df, columns, self.x_column, self.span_start, self.span_end,
+                                resample=bool(resample_step))
+            source.attrs['file_name'] = file_name
+            sources.append((source, columns))
+        jobs = sources
+        
+        progress_dialog = QProgressDialog("Exportiere...", "Abbrechen", 0, len(jobs), self)
+        progress_dialog.setWindowTitle("Export")
+        progress_dialog.setMinimumDuration(0)
+        
+        self.export_thread = ExportThread(jobs, out_dir, self.x_column, fmt, self.span_start, self.span_end,
+                                          resample_step or None, self)
+        
+        def on_progress(done, total, message):
+            progress_dialog.setValue(done)
+            progress_dialog.setLabelText(message)
+        
+        def on_cancel():
+            self.export_thread.cancelled = True
+        
+        def on_finished():
+            # Closing the dialog emits canceled, only a cancel by the user counts
+            cancelled = self.export_thread.cancelled
+            progress_dialog.canceled.disconnect(on_cancel)
+            progress_dialog.close()
+            exported = len(self.export_thread.results)
+            if cancelled:
+                message = f"Export abgebrochen, {exported} von {len(jobs)} Dateien nach {out_dir} exportiert."
+            else:
+                message = f"{exported} Dateien nach {out_dir} exportiert."
+            if self.export_thread.errors:
+                QMessageBox.warning(self, "Export", "\n".join([message] + self.export_thread.errors))
+            else:
+                QMessageBox.information(self, "Export", message)
+        
+        self.export_thread.progress.connect(on_progress)
+        self.export_thread.finished.connect(on_finished)
+        progress_dialog.canceled.connect(on_cancel)
+        self.export_thread.start()
+    
+    def search_segment(self):
+        """
+        Find all traversals of the selected span in a ride archive
+        """
+        if self.span_start is None or self.span_end is None:
+            QMessageBox.information(self, "Segment", "Bitte zuerst einen Bereich im Diagramm auswählen.")
+            return
+        if self.segment_thread is not None and self.segment_thread.isRunning():
+            QMessageBox.information(self, "Segment", "Es läuft bereits eine Segmentsuche.")
+            return
+        
+        # Files with GPS data that have the span
+        segments = {}
+        for df in self.dataframes:
+            if 'file_source' not in df.columns or df.empty:
+                continue
+            segment = segment_from_span(df, self.x_column, self.span_start, self.span_end)
+            if segment is not None and len(segment) >= 2:
+                segments[df['file_source'].iloc[0]] = segment
+        
+        if not segments:
+            QMessageBox.information(self, "Segment", "Der ausgewählte Bereich enthält keine GPS-Daten.")
+            return
+        
+        file_name = next(iter(segments))
+        if len(segments) > 1:
+            file_name, ok = QInputDialog.getItem(self, "Segment", "Segment aus Datei:", list(segments), 0, False)
+            if not ok:
+                return
+        segment = segments[file_name]
+        
+        archive_dir = QFileDialog.getExistingDirectory(self, 'Archiv mit FIT-Dateien wählen',
+                                                       self.archive_dir or str(Path.home()))
+        if not archive_dir:
+            return
+        self.archive_dir = archive_dir
+        
+        progress_dialog = QProgressDialog("Archiv wird indiziert...", None, 0, 0, self)
+        progress_dialog.setWindowTitle("Segment")
+        progress_dialog.setMinimumDuration(0)
+        
+        self.segment_thread = SegmentSearchThread(archive_dir, segment, self)
+        
+        def on_progress(done, total, message):
+            progress_dialog.setMaximum(total)
+            progress_dialog.setValue(done)
+            progress_dialog.setLabelText(f"Indiziere {message}")
+        
+        def on_finished():
+            progress_dialog.close()
+            if self.segment_thread.error:
+                QMessageBox.critical(self, "Fehler", f"Fehler bei der Segmentsuche: {self.segment_thread.error}")
+                return
+            dialog = SegmentResultsDialog(self.segment_thread.results,
+                                          path_length_m(segment['lat'], segment['lon']), self)
+            dialog.load_requested.connect(self.load_file)
+            dialog.show()
+        
+        self.segment_thread.progress.connect(on_progress)
+        self.segment_thread.finished.connect(on_finished)
+        self.segment_thread.start()
+    
     def remove_file(self, file_name):
         # Confirm with user
         msg_box = QMessageBox()
@@ -292,6 +623,11 @@ class TrainingPlotWindow(QMainWindow):
                              if 'file_source' not in df.columns or 
                              df['file_source'].iloc[0] != file_name]
             
+            # Drop cached histograms and the memory cache of this file
+            self.histograms = {key: histogram for key, histogram in self.histograms.items()
+                               if key[0] != file_name}
+            self.memory_budget.forget(file_name)
+            
             # Remove stats boxes
             if file_name in self.selected_y_columns:
                 for col in self.selected_y_columns[file_name]:
@@ -303,15 +639,118 @@ class TrainingPlotWindow(QMainWindow):
             self.populate_x_axis_menu()
             self.plot_data()
     
+    def get_file_histograms(self, file_name):
+        return {key: histogram for key, histogram in self.histograms.items() if key[0] == file_name}
+    
+    def ensure_loaded(self, file_name):
+        """
+        Marks a dataset as used and reloads it into RAM if it was spilled
+        """
+        self.memory_budget.touch(file_name)
+        if not self.memory_budget.is_spilled(file_name):
+            return
+        
+        for i, df in enumerate(self.dataframes):
+            if 'file_source' in df.columns and not df.empty and df['file_source'].iloc[0] == file_name:
+                df, histograms = self.memory_budget.reload(file_name, df, self.get_file_histograms(file_name))
+                self.dataframes[i] = df
+                self.histograms.update(histograms)
+                break
+    
+    def manage_memory(self):
+        """
+        Spills the least recently used hidden datasets until the budget is met
+        and shows the memory usage
+        """
+        sizes = {}
+        for df in self.dataframes:
+            if 'file_source' in df.columns and not df.empty:
+                file_name = df['file_source'].iloc[0]
+                sizes[file_name] = dataset_size(df, self.get_file_histograms(file_name).values())
+        
+        # Writing the cache files takes a while, it runs in the background;
+        # spill_thread is reset once finish_spill has swapped in the results
+        if self.spill_thread is None:
+            visible = {file_name for file_name, columns in self.selected_y_columns.items() if columns}
+            jobs = []
+            for file_name in self.memory_budget.eviction_candidates(sizes, visible):
+                for df in self.dataframes:
+                    if 'file_source' in df.columns and not df.empty and df['file_source'].iloc[0] == file_name:
+                        jobs.append((file_name, df, self.get_file_histograms(file_name),
+                                     self.memory_budget.cache_path(file_name)))
+                        break
+            if jobs:
+                self.spill_thread = SpillThread(jobs, self)
+                self.spill_thread.finished.connect(self.finish_spill)
+                self.spill_thread.start()
+        
+        used_mb = sum(sizes.values()) / (1024 * 1024)
+        budget_mb = self.memory_budget.budget_bytes / (1024 * 1024)
+        self.memory_label.setText(f"Speicher: {used_mb:.0f} / {budget_mb:.0f} MB")
+        self.memory_label.setStyleSheet("color: red;" if used_mb > budget_mb else "")
+    
+    def finish_spill(self):
+        """
+        Replaces the spilled datasets by their memory-mapped copies, runs on the GUI thread
+        """
+        visible = {file_name for file_name, columns in self.selected_y_columns.items() if columns}
+        swapped = False
+        for file_name, df, path, mapped_df, mapped_histograms in self.spill_thread.results:
+            # Skip datasets that were shown, removed or reloaded while writing
+            index = next((i for i, current in enumerate(self.dataframes) if current is df), None)
+            if index is None or file_name in visible or self.memory_budget.is_spilled(file_name):
+                remove_cache_file(path)
+                continue
+            self.dataframes[index] = mapped_df
+            self.histograms.update(mapped_histograms)
+            self.memory_budget.mark_spilled(file_name, path)
+            swapped = True
+        self.spill_thread = None
+        
+        # Update the usage display, further spills start if still over budget
+        if swapped:
+            self.manage_memory()
+    
+    def wait_for_spill(self):
+        if self.spill_thread is not None:
+            self.spill_thread.wait()
+    
+    def edit_memory_budget(self):
+        budget_mb, ok = QInputDialog.getInt(self, "Speicherbudget", "Speicherbudget (MB):",
+                                            int(self.memory_budget.budget_bytes / (1024 * 1024)), 64, 1024 * 1024)
+        if ok:
+            self.memory_budget.budget_bytes = budget_mb * 1024 * 1024
+            self.manage_memory()
+    
+    def closeEvent(self, event):
+        # Stop pending refreshes and remove the cache files of spilled datasets
+        self.refresh_scheduler.shutdown()
+        self.wait_for_spill()
+        self.memory_budget.cleanup()
+        super().closeEvent(event)
+    
     def setup_span_selector(self):
-        self.span = SpanSelector(
-            self.ax1,
-            self.on_select,
-            'horizontal',
-            useblit=True,
-            props=dict(alpha=0.2, facecolor='blue'),
-            interactive=True
-        )
+        self.plot_backend.setup_span_selector()
+    
+    def set_plot_backend(self, checked, name):
+        if not checked:
+            # Keep the active backend checked
+            for action in self.backend_menu.actions():
+                action.setChecked(action.data() == self.plot_backend.name)
+            return
+        
+        if name != self.plot_backend.name:
+            for widget in self.plot_backend.widgets():
+                self.plot_layout.removeWidget(widget)
+            self.plot_backend.close()
+            
+            self.plot_backend = create_plot_backend(name, self, self.on_select)
+            for widget in self.plot_backend.widgets():
+                self.plot_layout.addWidget(widget)
+            self.plot_data()
+        
+        for action in self.backend_menu.actions():
+            action.setChecked(action.data() == self.plot_backend.name)
     
     def on_select(self, xmin, xmax):
         self.span_start = xmin
@@ -326,195 +765,134 @@ class TrainingPlotWindow(QMainWindow):
         self.update_stats()
     
     def update_stats(self):
-        # Update stats for each selected column and each file
-        for file_name, columns in self.selected_y_columns.items():
-            # Find the dataframe for this file
-            df_list = [df for df in self.dataframes 
-                     if 'file_source' in df.columns and 
-                     not df.empty and 
-                     df['file_source'].iloc[0] == file_name]
-            
-            if not df_list:
-                continue
-                
-            df = df_list[0]
-            
-            for column in columns:
-                if column in df.columns:
-                    self.stats_panel.update_stats(
-                        column, 
-                        df, 
-                        self.x_column,
-                        file_name,
-                        self.span_start, 
-                        self.span_end
-                    )
+        """
+        Schedules a refresh of the statistics, see plot_data
+        """
+        self.refresh_scheduler.request(plot=False, stats=True)
+    
+    def get_histogram(self, histograms, file_name, df, column, x_column=None):
+        """
+        Returns the cumulative histogram of a column, built once per file and x column
+        
+        Args:
+            histograms: Cache to look up, a copy of self.histograms on the worker thread
+        
+        Returns:
+            Tuple (histogram or None, True if it was built and is not in the cache yet)
+        """
+        key = (file_name, x_column or self.x_column, column)
+        if key in histograms:
+            return histograms[key], False
+        return ChannelHistogram.from_dataframe(df, key[1], column), True
+    
+    def edit_zones(self):
+        ftp, ok = QInputDialog.getInt(self, "Zonen einstellen", "FTP (Watt):",
+                                      self.stats_panel.ftp, 50, 1000)
+        if not ok:
+            return
+        max_heart_rate, ok = QInputDialog.getInt(self, "Zonen einstellen", "Maximale Herzfrequenz:",
+                                                 self.stats_panel.max_heart_rate, 100, 240)
+        if not ok:
+            return
+        
+        self.stats_panel.ftp = ftp
+        self.stats_panel.max_heart_rate = max_heart_rate
+        self.update_stats()
     
     def get_display_column(self, df, column):
         """
         Returns the correct display column based on the selected column
         """
-        # For timestamp_numeric return original timestamp
-        if column == 'timestamp_numeric' and 'timestamp' in df.columns:
-            return 'timestamp'
-        # For time_of_day_numeric return original time_of_day
-        elif column == 'time_of_day_numeric' and 'time_of_day' in df.columns:
-            return 'time_of_day'
-        return column
+        return get_display_column(df, column)
     
     def plot_data(self):
-        # Check if we have data to plot
-        has_data_to_plot = False
-        for file_name, columns in self.selected_y_columns.items():
-            if columns:  # If there are selected columns for this file
-                has_data_to_plot = True
-                break
-        
-        if not has_data_to_plot or not self.dataframes:
-            # Clear the plot if no data to display
-            self.figure.clear()
-            self.ax1 = self.figure.add_subplot(111)
-            self.ax1.set_title('Keine Daten zum Anzeigen')
-            self.canvas.draw()
-            return
-            
-        self.figure.clear()
-        self.axes = {}
-        
-        # Create the main axis
-        self.ax1 = self.figure.add_subplot(111)
-        
-        # Store the right-side y-axes we create
-        right_axes = []
+        """
+        Schedules a refresh of the plot and the statistics
         
-        # Track all columns across all files
-        all_columns = []
+        Bursts of calls are coalesced into one refresh; the series and stats
+        are computed on a worker thread and only the final result is drawn.
+        """
+        self.refresh_scheduler.request(plot=True, stats=True)
+    
+    def snapshot_refresh_state(self, plot, stats):
+        """
+        Copies the state a refresh needs, runs on the GUI thread
+        """
+        # Spilled datasets are reloaded here, never from the worker thread
         for file_name, columns in self.selected_y_columns.items():
-            for column in columns:
-                if column not in all_columns:
-                    all_columns.append(column)
-        
-        # Create a y-axis for each unique column
-        for i, y_column in enumerate(all_columns):
-            color = get_axis_color(i)
-            
-            if i == 0:
-                # First dataset uses the main left y-axis
-                ax = self.ax1
-                ax.set_ylabel(y_column, color=color)
-                ax.tick_params(axis='y', labelcolor=color)
-            else:
-                # Create a new y-axis on the right for each additional dataset
-                ax = self.ax1.twinx()
-                
-                # Offset each additional axis to prevent overlap
-                if right_axes:
-                    offset = 60 * (len(right_axes))
-                    ax.spines['right'].set_position(('outward', offset))
-                
-                ax.set_ylabel(y_column, color=color)
-                ax.tick_params(axis='y', labelcolor=color)
-                right_axes.append(ax)
-            
-            # Store the axis for this column
-            self.axes[y_column] = ax
-            
-            # Plot data from each file that has this column selected
-            for file_idx, df in enumerate(self.dataframes):
-                if df.empty or 'file_source' not in df.columns:
+            if columns:
+                self.ensure_loaded(file_name)
+        
+        return {
+            'plot': plot,
+            'stats': stats,
+            'dataframes': list(self.dataframes),
+            'selected_y_columns': {file_name: list(columns) for file_name, columns in self.selected_y_columns.items()},
+            'x_column': self.x_column,
+            'span_start': self.span_start,
+            'span_end': self.span_end,
+            'max_points': self.plot_backend.max_points,
+            # The worker only reads this copy, new histograms are stored in apply_refresh
+            'histograms': dict(self.histograms)
+        }
+    
+    def compute_refresh(self, state):
+        """
+        Computes the plot model and the statistics, runs on the worker thread
+        """
+        result = dict(state, model=None, stats_results=[], new_histograms=[])
+        
+        if state['plot']:
+            # Check if we have data to plot
+            has_data_to_plot = any(columns for columns in state['selected_y_columns'].values())
+            if has_data_to_plot and state['dataframes']:
+                result['model'] = build_plot_model(state['dataframes'], state['selected_y_columns'],
+                                                   state['x_column'], state['max_points'])
+        
+        if state['stats']:
+            # Stats for each selected column and each file
+            for df in state['dataframes']:
+                if 'file_source' not in df.columns or df.empty:
                     continue
-                    
                 file_name = df['file_source'].iloc[0]
-                
-                # Skip if column not selected for this file
-                if (file_name not in self.selected_y_columns or 
-                    y_column not in self.selected_y_columns[file_name]):
-                    continue
-                
-                # Skip if column not in this dataframe
-                if y_column not in df.columns:
-                    continue
-                    
-                # Use correct display column for X-axis
-                display_x_column = self.get_display_column(df, self.x_column)
-                
-                # Check if X column exists
-                if display_x_column not in df.columns and self.x_column not in df.columns:
-                    continue
-                
-                line_style = get_line_style(file_idx)
-                label = f"{y_column} - {file_name}"
-                
-                # Plot the data using the appropriate axis and formatting
-                try:
-                    if display_x_column == 'timestamp' and 'timestamp_numeric' in df.columns:
-                        # Plot with timestamp as X-axis
-                        ax.plot(df[display_x_column], df[y_column], label=label, color=color, linestyle=line_style)
-                        self.ax1.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
-                        self.ax1.xaxis.set_major_locator(mdates.AutoDateLocator())
-                        self.figure.autofmt_xdate()  # Auto-rotate date labels
-                        
-                        # Store the numerical values for span selection
-                        self.x_display_to_numeric = {
-                            ts.timestamp(): num for ts, num in zip(df['timestamp'], df['timestamp_numeric'])
-                        }
-                        
-                    elif display_x_column == 'time_of_day' and 'time_of_day_numeric' in df.columns:
-                        # Plot with time_of_day as X-axis using the numeric values for positioning
-                        ax.plot(df['time_of_day_numeric'], df[y_column], label=label, color=color, linestyle=line_style)
-                        
-                        # Create custom formatter to show time_of_day strings
-                        def format_time_of_day(x, pos):
-                            # Find the closest time_of_day value
-                            idx = np.abs(df['time_of_day_numeric'].values - x).argmin()
-                            if idx < len(df):
-                                return df['time_of_day'].iloc[idx]
-                            return ''
-                        
-                        self.ax1.xaxis.set_major_formatter(plt.FuncFormatter(format_time_of_day))
-                        # Use about 5-10 ticks depending on data size
-                        num_ticks = min(10, max(5, len(df) // 100))
-                        self.ax1.xaxis.set_major_locator(plt.MaxNLocator(num_ticks))
-                        self.figure.autofmt_xdate()  # Auto-rotate time labels
-                    else:
-                        # Regular numeric x-axis
-                        plot_column = self.x_column if self.x_column in df.columns else display_x_column
-                        ax.plot(df[plot_column], df[y_column], label=label, color=color, linestyle=line_style)
-                except Exception as e:
-                    print(f"Fehler beim Plotten von {y_column} für {file_name}: {e}")
-        
-        # Set x-label based on the selected x column
-        if self.x_column == 'elapsed_time':
-            self.ax1.set_xlabel("Zeit (Minuten)")
-        elif self.x_column == 'timestamp_numeric':
-            self.ax1.set_xlabel("Uhrzeit")
-        elif self.x_column == 'time_of_day_numeric':
-            self.ax1.set_xlabel("Tageszeit")
-        else:
-            self.ax1.set_xlabel(self.x_column)
-            
-        self.ax1.set_title('Trainingsdaten')
-        self.ax1.grid(True)
-        
-        # Add legend
-        handles, labels = [], []
-        for ax in [self.ax1] + right_axes:
-            h, l = ax.get_legend_handles_labels()
-            handles.extend(h)
-            labels.extend(l)
-        
-        if handles:
-            self.ax1.legend(handles, labels, loc='upper left', bbox_to_anchor=(0, -0.15), ncol=3)
-        
-        # Highlight selected region if any
-        if self.span_start is not None and self.span_end is not None:
-            self.ax1.axvspan(self.span_start, self.span_end, alpha=0.2, color='blue')
-        
-        self.figure.tight_layout()
-        self.canvas.draw()
+                for column in state['selected_y_columns'].get(file_name, []):
+                    if column not in df.columns:
+                        continue
+                    histogram, built = self.get_histogram(state['histograms'], file_name, df, column,
+                                                          state['x_column'])
+                    if built:
+                        key = (file_name, state['x_column'], column)
+                        state['histograms'][key] = histogram
+                        result['new_histograms'].append((key, df, histogram))
+                    stats, integer_values = self.stats_panel.compute_stats(
+                        column, df, state['x_column'], state['span_start'], state['span_end'], histogram)
+                    result['stats_results'].append((column, file_name, stats, integer_values))
+        return result
+    
+    def apply_refresh(self, result):
+        """
+        Draws a computed refresh, runs on the GUI thread
+        """
+        # Keep the new histograms only if their dataset is still loaded unchanged,
+        # it may have been removed or replaced by a workspace meanwhile
+        current = {id(df) for df in self.dataframes}
+        for key, df, histogram in result['new_histograms']:
+            if id(df) in current and key not in self.histograms:
+                self.histograms[key] = histogram
+        
+        if result['plot']:
+            if result['model'] is None:
+                # Clear the plot if no data to display
+                self.plot_backend.show_empty('Keine Daten zum Anzeigen')
+            else:
+                self.plot_backend.render(result['model'], result['x_column'],
+                                         result['span_start'], result['span_end'])
+                # Update the span selector to use the new axis
+                self.setup_span_selector()
         
-        # Update statistics based on current selection
-        self.update_stats()
+        for column, file_name, stats, integer_values in result['stats_results']:
+            self.stats_panel.show_stats(column, file_name, stats, integer_values)
         
-        # Update the span selector to use the new axis
-        self.setup_span_selector()
\ No newline at end of file
+        # Datasets or histograms may have changed with a replot
+        if result['plot']:
+            self.manage_memory()
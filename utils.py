@@ -39,7 +39,8 @@ def parse_fit_file(file_path):
             df = df.sort_values(by='timestamp')
             
             # Create numeric version for filtering - convert to Unix timestamp
-            df['timestamp_numeric'] = df['timestamp'].astype(np.int64) // 10**9
+            # Go through datetime64[s], the nanosecond assumption does not hold for every pandas version
+            df['timestamp_numeric'] = df['timestamp'].values.astype('datetime64[s]').astype(np.int64)
             
             # Add time_of_day column - formatted time string
             df['time_of_day'] = df['timestamp'].dt.strftime('%H:%M:%S')
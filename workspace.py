@@ -0,0 +1,176 @@
+import json
+import os
+import struct
+import numpy as np
+import pandas as pd
+
+from span_stats import ChannelHistogram
+
+# Workspace file layout:
+#   MAGIC | header length (uint64 little endian) | JSON header | padding | data
+# The JSON header holds the UI state and the layout of every column and index
+# array. All arrays are stored raw and aligned, so opening a workspace only
+# maps the file; pages are read from disk when a column is actually used.
+MAGIC = b'FITWS\x00\x01\x00'
+WORKSPACE_SUFFIX = '.fitws'
+ALIGNMENT = 64
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _encode_column(series):
+    """
+    Return (column description, array or None, missing value mask or None) for a DataFrame column
+
+    Text and mixed-type object columns are stored as strings, so the round trip
+    is lossy for them: every present value comes back as str. Missing values
+    are kept in a mask and come back as None.
+    """
+    name = str(series.name)
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        values = series.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy()
+        return {'name': name, 'kind': 'datetime', 'tz': str(series.dtype.tz)}, values, None
+    if pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_datetime64_dtype(series.dtype):
+        values = series.to_numpy()
+        if values.dtype.kind in 'biufcM':
+            return {'name': name, 'kind': 'array'}, values, None
+
+    missing = series.isna().to_numpy(dtype=bool)
+    mask = missing if missing.any() else None
+    strings = series.astype(str).to_numpy()
+    present = strings[~missing]
+
+    # Constant columns (like file_source) and entirely missing ones go into the header
+    if not len(present):
+        return {'name': name, 'kind': 'constant', 'value': None}, None, None
+    if (present == present[0]).all():
+        return {'name': name, 'kind': 'constant', 'value': str(present[0])}, None, mask
+    return {'name': name, 'kind': 'text'}, strings.astype(str), mask
+
+
+def _decode_column(description, array, mask, length):
+    kind = description['kind']
+    if kind == 'constant':
+        # Every row references the same string object
+        values = np.full(length, description['value'], dtype=object)
+    elif kind == 'datetime':
+        return pd.Series(array, copy=False).dt.tz_localize('UTC').dt.tz_convert(description['tz'])
+    elif kind == 'text':
+        values = array.astype(object)
+    else:
+        return pd.Series(array, copy=False)
+
+    if mask is not None:
+        values[mask] = None
+    return pd.Series(values)
+
+
+def save_workspace(path, dataframes, state, histograms=None):
+    """
+    Save the loaded datasets, their histograms and the UI state to a workspace file
+
+    Args:
+        path: Target file path
+        dataframes: List of loaded DataFrames
+        state: JSON serializable dictionary with the UI state
+        histograms: Optional dictionary (file name, x column, column) -> ChannelHistogram
+    """
+    arrays = []  # (description dict to receive the layout, array)
+
+    datasets = []
+    for df in dataframes:
+        columns = []
+        for column in df.columns:
+            description, array, mask = _encode_column(df[column])
+            if array is not None:
+                arrays.append((description, array))
+            if mask is not None:
+                description['mask'] = {}
+                arrays.append((description['mask'], mask))
+            columns.append(description)
+        datasets.append({'length': len(df), 'columns': columns})
+
+    stored_histograms = []
+    for (file_name, x_column, column), histogram in (histograms or {}).items():
+        if histogram is None:
+            continue
+        fields, meta = histogram.to_arrays()
+        description = {'file_name': file_name, 'x_column': x_column, 'column': column,
+                       'meta': meta, 'arrays': {}}
+        for field, array in fields.items():
+            array_description = {}
+            description['arrays'][field] = array_description
+            arrays.append((array_description, array))
+        stored_histograms.append(description)
+
+    # Layout of the data section, offsets are relative to its start
+    offset = 0
+    for description, array in arrays:
+        array = np.ascontiguousarray(array)
+        description.update({'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset})
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({'state': state, 'datasets': datasets,
+                         'histograms': stored_histograms}).encode('utf-8')
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    # Write to a temporary file first so a failed save keeps the old workspace
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for description, array in arrays:
+            f.seek(data_start + description['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def load_workspace(path):
+    """
+    Open a workspace file, the data columns are memory-mapped and read lazily
+
+    Returns:
+        Tuple (dataframes, state, histograms)
+
+    Raises:
+        ValueError: If the file is not a workspace file
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Keine gültige Arbeitsbereich-Datei: {path}")
+        header_length, = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_length).decode('utf-8'))
+
+    data_start = _align(len(MAGIC) + 8 + header_length)
+    size = os.path.getsize(path)
+    data = np.memmap(path, dtype=np.uint8, mode='r') if size > data_start else None
+
+    def view(description):
+        dtype = np.dtype(description['dtype'])
+        count = int(np.prod(description['shape']))
+        if count == 0:
+            return np.empty(description['shape'], dtype=dtype)
+        start = data_start + description['offset']
+        return data[start:start + count * dtype.itemsize].view(dtype).reshape(description['shape'])
+
+    dataframes = []
+    for dataset in header['datasets']:
+        columns = {}
+        for description in dataset['columns']:
+            array = view(description) if 'dtype' in description else None
+            mask = view(description['mask']) if 'mask' in description else None
+            columns[description['name']] = _decode_column(description, array, mask, dataset['length'])
+        dataframes.append(pd.DataFrame(columns, copy=False))
+
+    histograms = {}
+    for description in header['histograms']:
+        fields = {field: view(array_description)
+                  for field, array_description in description['arrays'].items()}
+        key = (description['file_name'], description['x_column'], description['column'])
+        histograms[key] = ChannelHistogram.from_arrays(fields, description['meta'])
+
+    return dataframes, header['state'], histograms